@@ -3,15 +3,23 @@ import os
 import time
 import queue
 import threading
-import subprocess
+from multiprocessing.shared_memory import SharedMemory
 import tkinter as tk
 from tkinter import messagebox
 
-from PIL import Image, ImageTk, ImageDraw
+import cv2
+import numpy as np
+from PIL import Image, ImageTk
 
-from picamera2 import Picamera2
-from picamera2.encoders import H264Encoder
-from picamera2.outputs import FileOutput
+from picamera2 import Picamera2, MappedArray
+from picamera2.encoders import H264Encoder, JpegEncoder
+from picamera2.outputs import FfmpegOutput
+
+# The preview's per-tick cvtColor calls: let OpenCV use its SIMD (NEON) kernels and every core
+cv2.setUseOptimized(True)
+cv2.setNumThreads(os.cpu_count() or 4)
+if not cv2.useOptimized():
+    print("OpenCV built without optimized (NEON) code paths; preview conversion will be slower")
 
 # === Your requested settings ===
 RECORD_SIZE = (1920, 1080)
@@ -24,13 +32,57 @@ PREVIEW_SIZE = (640, 360)
 BITRATE = 8_000_000  # 8 Mbps per camera (you can change)
 
 LINE_W = 6  # separator line width in preview
+SHUTDOWN_JOIN_S = 3.0  # per camera; the workers are daemons, so wait for them to free their SharedMemory
+
+# Fragmented MP4: written directly while recording, so Stop only flushes the last fragment
+MP4_MOVFLAGS = "+frag_keyframe+empty_moov"
+
+
+def _pi_model() -> str:
+    try:
+        with open("/proc/device-tree/model") as f:
+            return f.read().rstrip("\x00")
+    except OSError:
+        return ""
+
+
+# Pi 5 has no H.264 block (picamera2 encodes in software via libav, several frames of latency);
+# MJPEG has no inter-frame dependency, so use it there (trade-off: files are ~3x bigger).
+USE_MJPEG = any(m in _pi_model() for m in ("Pi 5", "Module 5", "Pi 500"))
+REC_EXT = ".mkv" if USE_MJPEG else ".mp4"
+
+
+def make_encoder():
+    if USE_MJPEG:
+        return JpegEncoder()
+    return make_h264_encoder()
+
+
+def make_output(path):
+    # FfmpegOutput splits its "filename" into ffmpeg args, so the movflags ride along
+    if USE_MJPEG:
+        return FfmpegOutput(path, audio=False)  # MJPEG copied into Matroska
+    return FfmpegOutput(f"-movflags {MP4_MOVFLAGS} {path}", audio=False)
+
+
+def make_h264_encoder():
+    # Baseline profile has no B-frames, so every frame leaves the encoder as soon as it is coded;
+    # a 1 s GOP (iperiod=FPS) bounds keyframe distance.
+    # Pi 4: V4L2 hardware encoder honours profile/iperiod. Pi 5: libav software encoder, same knobs.
+    try:
+        return H264Encoder(bitrate=BITRATE, iperiod=FPS, profile="baseline")
+    except TypeError:
+        # older picamera2 without profile=
+        return H264Encoder(bitrate=BITRATE, iperiod=FPS)
 
 
-def ffmpeg_wrap_h264_to_mp4(h264_path: str, mp4_path: str, fps: int):
-    # Fast "wrap" (no re-encode)
-    cmd = ["ffmpeg", "-y", "-r", str(fps), "-i", h264_path,
-           "-c", "copy", "-movflags", "+faststart", mp4_path]
-    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+def drain(q: queue.Queue):
+    # One lock acquire for the whole backlog instead of a get_nowait()/Empty round per message
+    with q.mutex:
+        items = list(q.queue)
+        q.queue.clear()
+        q.not_full.notify_all()
+    return items
 
 
 class CameraWorker(threading.Thread):
@@ -45,8 +97,12 @@ class CameraWorker(threading.Thread):
         self.cmd_q = cmd_q
         self.evt_q = evt_q
 
-        self.frame_lock = threading.Lock()
-        self.latest_frame = None
+        self.latest_frame = None  # swapped as a single reference (atomic under the GIL), no lock
+        # Two lores buffers in one SharedMemory block, filled alternately from the mapped DMA buffer.
+        # Fixed for the session (no per-frame allocation) and ready to be shared with a worker process.
+        self._shm = None
+        self._bufs = None
+        self._buf_idx = 0
 
         self.running = True
         self.recording = False
@@ -55,22 +111,21 @@ class CameraWorker(threading.Thread):
         self.encoder = None
         self.output = None
 
-        self.cur_h264 = None
-        self.cur_mp4 = None
+        self.cur_out = None
 
     def get_latest_frame(self):
-        with self.frame_lock:
-            return self.latest_frame
+        return self.latest_frame
 
     def run(self):
         try:
             self.picam2 = Picamera2(camera_num=self.camera_num)
             config = self.picam2.create_video_configuration(
                 main={"size": RECORD_SIZE},
-                lores={"size": PREVIEW_SIZE, "format": "RGB888"},
+                lores={"size": PREVIEW_SIZE, "format": "YUV420"},  # 12 bpp: half the bytes of RGB888
                 controls={"FrameRate": FPS},
             )
             self.picam2.configure(config)
+            self.picam2.post_callback = self._on_request
             self.picam2.start()
             self.evt_q.put(("ready", self.cam_id, None))
             self.evt_q.put(("status", self.cam_id, "Preview running"))
@@ -78,48 +133,70 @@ class CameraWorker(threading.Thread):
             self.evt_q.put(("fatal", self.cam_id, f"Camera init failed: {e}"))
             return
 
-        target_dt = 1.0 / FPS
-
         while self.running:
-            # handle commands (start/stop/shutdown)
-            try:
-                while True:
-                    cmd, payload = self.cmd_q.get_nowait()
-                    if cmd == "shutdown":
-                        self._shutdown()
-                        return
-                    elif cmd == "start":
-                        self._start_recording(payload)
-                    elif cmd == "stop":
-                        self._stop_recording()
-            except queue.Empty:
-                pass
+            # frames arrive via _on_request; this thread only services commands,
+            # so block until one is enqueued (shutdown is a command too)
+            cmd, payload = self.cmd_q.get()
+            if cmd == "shutdown":
+                self._shutdown()
+                return
+            elif cmd == "start":
+                self._start_recording(payload)
+            elif cmd == "stop":
+                self._stop_recording()
 
-            # grab preview frame
-            try:
-                frame = self.picam2.capture_array("lores")
-                with self.frame_lock:
-                    self.latest_frame = frame
-            except Exception:
-                time.sleep(0.02)
+    def _on_request(self, request):
+        # Runs once per completed ISP request (picamera2 callback thread)
+        try:
+            with MappedArray(request, "lores") as m:
+                if self._bufs is None:
+                    self._alloc_frame_bufs(m.array.shape, m.array.dtype)
+                # copy into the buffer the GUI is not looking at, then publish it
+                self._buf_idx ^= 1
+                frame = self._bufs[self._buf_idx]
+                np.copyto(frame, m.array)
+            self.latest_frame = frame
+            self.evt_q.put(("frame", self.cam_id, None))
+        except Exception:
+            pass
 
-            time.sleep(target_dt)
+    def _alloc_frame_bufs(self, shape, dtype):
+        nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        self._shm = SharedMemory(create=True, size=2 * nbytes)
+        self._bufs = tuple(
+            np.ndarray(shape, dtype, buffer=self._shm.buf, offset=i * nbytes) for i in (0, 1)
+        )
 
-    def _start_recording(self, paths):
+    def _free_frame_bufs(self):
+        shm = self._shm
+        if shm is None:
+            return
+        # views must be gone before the mapping can be closed
+        self.latest_frame = None
+        self._bufs = None
+        self._shm = None
+        try:
+            shm.close()
+        except BufferError:
+            pass
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+    def _start_recording(self, out_path):
         if self.recording:
             return
-        h264_path, mp4_path = paths
-        self.cur_h264 = h264_path
-        self.cur_mp4 = mp4_path
+        self.cur_out = out_path
 
         try:
             self.evt_q.put(("status", self.cam_id, "Starting recording"))
-            self.encoder = H264Encoder(bitrate=BITRATE)
-            self.output = FileOutput(h264_path)
+            self.encoder = make_encoder()
+            self.output = make_output(out_path)
             self.picam2.start_recording(self.encoder, self.output)
             self.recording = True
             self.evt_q.put(("recording", self.cam_id, True))
-            self.evt_q.put(("status", self.cam_id, f"Recording -> {os.path.basename(mp4_path)}"))
+            self.evt_q.put(("status", self.cam_id, f"Recording -> {os.path.basename(out_path)}"))
         except Exception as e:
             self.recording = False
             self.encoder = None
@@ -157,26 +234,10 @@ class CameraWorker(threading.Thread):
             self.evt_q.put(("ready", self.cam_id, None))
             return
 
-        # Convert h264->mp4 off-thread (do not block preview)
-        h264_path = self.cur_h264
-        mp4_path = self.cur_mp4
-
-        def convert():
-            try:
-                self.evt_q.put(("status", self.cam_id, "Saving MP4"))
-                ffmpeg_wrap_h264_to_mp4(h264_path, mp4_path, FPS)
-                try:
-                    os.remove(h264_path)
-                except OSError:
-                    pass
-                self.evt_q.put(("saved", self.cam_id, mp4_path))
-            except Exception as e:
-                self.evt_q.put(("error", self.cam_id, f"FFmpeg failed: {e}"))
-            finally:
-                self.evt_q.put(("status", self.cam_id, "Preview running"))
-                self.evt_q.put(("ready", self.cam_id, None))
-
-        threading.Thread(target=convert, daemon=True).start()
+        # File is already finalized by stop_recording(); nothing left to convert
+        self.evt_q.put(("saved", self.cam_id, self.cur_out))
+        self.evt_q.put(("status", self.cam_id, "Preview running"))
+        self.evt_q.put(("ready", self.cam_id, None))
 
     def _shutdown(self):
         self.running = False
@@ -190,6 +251,8 @@ class CameraWorker(threading.Thread):
                 self.picam2.stop()
         except Exception:
             pass
+        # camera stopped -> no more callbacks touching the shared buffers
+        self._free_frame_bufs()
 
 
 class DualCamApp:
@@ -228,11 +291,21 @@ class DualCamApp:
         self.ready = {0: False, 1: False}
         self.recording = {0: False, 1: False}
         self.last_status = {0: "Starting", 1: "Starting"}
-
-        self._tk_image = None
+        self._fresh = {0: False, 1: False}
+
+        # One shared RGB buffer for both previews (slice-assigned per frame), separator filled once
+        w, h = PREVIEW_SIZE
+        self._buf = np.zeros((h, w + LINE_W + w, 3), dtype=np.uint8)
+        self._buf[:, w:w + LINE_W] = 255
+        # Contiguous per-camera cvtColor targets; a column slice of _buf isn't a valid dst
+        self._rgb = (np.empty((h, w, 3), dtype=np.uint8), np.empty((h, w, 3), dtype=np.uint8))
+        # Never reassigned: each frame is paste()d into this one Tk photo (no per-frame photo churn)
+        self._tk_image = ImageTk.PhotoImage("RGB", (w + LINE_W + w, h))
+        self._tk_image.paste(Image.fromarray(self._buf))
+        self.video_label.configure(image=self._tk_image)
 
         self.poll_events()
-        self.update_preview()
+        self.preview_watchdog()
 
     def set_buttons(self):
         all_ready = self.ready[0] and self.ready[1]
@@ -244,35 +317,39 @@ class DualCamApp:
         self.status.set(f"Cam0: {self.last_status[0]}  |  Cam1: {self.last_status[1]}")
 
     def poll_events(self):
-        try:
-            while True:
-                typ, cam_id, payload = self.evt_q.get_nowait()
-
-                if typ == "ready":
-                    self.ready[cam_id] = True
-                elif typ == "recording":
-                    self.recording[cam_id] = bool(payload)
-                    # when recording starts, consider that cam not "ready" for new record
-                    self.ready[cam_id] = not self.recording[cam_id]
-                elif typ == "status":
-                    self.last_status[cam_id] = payload
-                elif typ == "saved":
-                    self.last_status[cam_id] = f"Saved {os.path.basename(payload)}"
-                elif typ == "error":
-                    self.last_status[cam_id] = "Error"
-                    messagebox.showerror(f"Camera {cam_id} error", payload)
-                    self.ready[cam_id] = True
-                    self.recording[cam_id] = False
-                elif typ == "fatal":
-                    messagebox.showerror(f"Camera {cam_id} fatal", payload)
-                    self.root.destroy()
-                    return
-
-                self.set_buttons()
-        except queue.Empty:
-            pass
+        for typ, cam_id, payload in drain(self.evt_q):
+            if typ == "frame":
+                # render as soon as both cameras have delivered a new frame
+                self._fresh[cam_id] = True
+                if self._fresh[0] and self._fresh[1]:
+                    self._fresh[0] = self._fresh[1] = False
+                    self.update_preview()
+                continue
+
+            if typ == "ready":
+                self.ready[cam_id] = True
+            elif typ == "recording":
+                self.recording[cam_id] = bool(payload)
+                # when recording starts, consider that cam not "ready" for new record
+                self.ready[cam_id] = not self.recording[cam_id]
+            elif typ == "status":
+                self.last_status[cam_id] = payload
+            elif typ == "saved":
+                self.last_status[cam_id] = f"Saved {os.path.basename(payload)}"
+            elif typ == "error":
+                self.last_status[cam_id] = "Error"
+                messagebox.showerror(f"Camera {cam_id} error", payload)
+                self.ready[cam_id] = True
+                self.recording[cam_id] = False
+            elif typ == "fatal":
+                messagebox.showerror(f"Camera {cam_id} fatal", payload)
+                self._shutdown_workers()
+                self.root.destroy()
+                return
 
-        self.root.after(100, self.poll_events)
+            self.set_buttons()
+
+        self.root.after(50, self.poll_events)
 
     def update_preview(self):
         f0 = self.worker0.get_latest_frame()
@@ -280,24 +357,20 @@ class DualCamApp:
 
         if f0 is not None and f1 is not None:
             try:
-                img0 = Image.fromarray(f0)
-                img1 = Image.fromarray(f1)
-
-                w, h = img0.size
-                out = Image.new("RGB", (w + LINE_W + w, h), (0, 0, 0))
-                out.paste(img0, (0, 0))
-                out.paste(img1, (w + LINE_W, 0))
-
-                draw = ImageDraw.Draw(out)
-                # separator line
-                draw.rectangle([w, 0, w + LINE_W - 1, h], fill=(255, 255, 255))
-
-                self._tk_image = ImageTk.PhotoImage(out)
-                self.video_label.configure(image=self._tk_image)
+                w, h = PREVIEW_SIZE
+                cv2.cvtColor(f0, cv2.COLOR_YUV2RGB_I420, dst=self._rgb[0])
+                cv2.cvtColor(f1, cv2.COLOR_YUV2RGB_I420, dst=self._rgb[1])
+                self._buf[:, :w] = self._rgb[0]
+                self._buf[:, w + LINE_W:] = self._rgb[1]
+                # Pillow copies RGB data on wrap, so the image has to be rebuilt from _buf each frame
+                self._tk_image.paste(Image.fromarray(self._buf))
             except Exception:
                 pass
 
-        self.root.after(int(1000 / FPS), self.update_preview)
+    def preview_watchdog(self):
+        # Safety net only: frames normally trigger update_preview from poll_events
+        self.update_preview()
+        self.root.after(500, self.preview_watchdog)
 
     def on_record(self):
         # disable until both workers report recording
@@ -309,13 +382,11 @@ class DualCamApp:
         os.makedirs(out_dir, exist_ok=True)
         ts = time.strftime("%Y%m%d_%H%M%S")
 
-        h264_0 = os.path.join(out_dir, f"cam0_{ts}.h264")
-        mp4_0  = os.path.join(out_dir, f"cam0_{ts}.mp4")
-        h264_1 = os.path.join(out_dir, f"cam1_{ts}.h264")
-        mp4_1  = os.path.join(out_dir, f"cam1_{ts}.mp4")
+        out_0 = os.path.join(out_dir, f"cam0_{ts}{REC_EXT}")
+        out_1 = os.path.join(out_dir, f"cam1_{ts}{REC_EXT}")
 
-        self.cmd_q0.put(("start", (h264_0, mp4_0)))
-        self.cmd_q1.put(("start", (h264_1, mp4_1)))
+        self.cmd_q0.put(("start", out_0))
+        self.cmd_q1.put(("start", out_1))
 
     def on_stop(self):
         self.cmd_q0.put(("stop", None))
@@ -328,9 +399,15 @@ class DualCamApp:
             self.on_stop()
             return
 
+        self._shutdown_workers()
+        self.root.destroy()
+
+    def _shutdown_workers(self):
+        # Unjoined daemon threads die with the interpreter before _free_frame_bufs unlinks the segments
         self.cmd_q0.put(("shutdown", None))
         self.cmd_q1.put(("shutdown", None))
-        self.root.destroy()
+        for w in (self.worker0, self.worker1):
+            w.join(timeout=SHUTDOWN_JOIN_S)
 
 
 if __name__ == "__main__":
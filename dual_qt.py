@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import (
+    QApplication, QWidget, QHBoxLayout, QVBoxLayout, QPushButton, QLabel, QMessageBox
+)
+
+from picamera2 import Picamera2
+from picamera2.encoders import H264Encoder
+from picamera2.outputs import FfmpegOutput
+from picamera2.previews.qt import QGlPicamera2
+
+# Same settings as dual.py; preview is drawn by GL textures (no RGB copy through Tk/X)
+RECORD_SIZE = (1920, 1080)
+FPS = 10
+PREVIEW_SIZE = (640, 360)
+BITRATE = 8_000_000  # 8 Mbps per camera
+
+MP4_MOVFLAGS = "+frag_keyframe+empty_moov"
+
+
+def make_h264_encoder():
+    try:
+        return H264Encoder(bitrate=BITRATE, iperiod=FPS, profile="baseline")
+    except TypeError:
+        return H264Encoder(bitrate=BITRATE, iperiod=FPS)
+
+
+class DualCamQtApp(QWidget):
+    """
+    Two QGlPicamera2 widgets side by side; the compositor does the "composite".
+    Recording uses start_encoder/stop_encoder so the preview is never restarted.
+    """
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("Dual Camera Recorder")
+
+        self.cams = []
+        self.encoders = {}
+        self.recording = False
+
+        previews = QHBoxLayout()
+        for camera_num in (0, 1):
+            picam2 = Picamera2(camera_num=camera_num)
+            config = picam2.create_video_configuration(
+                main={"size": RECORD_SIZE},
+                lores={"size": PREVIEW_SIZE},
+                display="lores",
+                controls={"FrameRate": FPS},
+            )
+            picam2.configure(config)
+            previews.addWidget(QGlPicamera2(picam2, width=PREVIEW_SIZE[0], height=PREVIEW_SIZE[1], keep_ar=True))
+            self.cams.append(picam2)
+
+        self.btn_record = QPushButton("Record")
+        self.btn_stop = QPushButton("Stop")
+        self.btn_stop.setEnabled(False)
+        self.btn_record.clicked.connect(self.on_record)
+        self.btn_stop.clicked.connect(self.on_stop)
+        self.status = QLabel("Preview running")
+
+        buttons = QHBoxLayout()
+        buttons.addWidget(self.btn_record)
+        buttons.addWidget(self.btn_stop)
+
+        layout = QVBoxLayout(self)
+        layout.addLayout(previews)
+        layout.addLayout(buttons)
+        layout.addWidget(self.status)
+
+        # widgets must exist before the cameras start
+        for picam2 in self.cams:
+            picam2.start()
+
+    def on_record(self):
+        if self.recording:
+            return
+        out_dir = os.path.expanduser("~/Videos")
+        os.makedirs(out_dir, exist_ok=True)
+        ts = time.strftime("%Y%m%d_%H%M%S")
+
+        try:
+            for cam_id, picam2 in enumerate(self.cams):
+                mp4_path = os.path.join(out_dir, f"cam{cam_id}_{ts}.mp4")
+                encoder = make_h264_encoder()
+                picam2.start_encoder(encoder, FfmpegOutput(f"-movflags {MP4_MOVFLAGS} {mp4_path}", audio=False))
+                self.encoders[cam_id] = (encoder, mp4_path)
+        except Exception as e:
+            self._stop_encoders()
+            QMessageBox.critical(self, "Error", f"Failed to start recording: {e}")
+            return
+
+        self.recording = True
+        self.btn_record.setEnabled(False)
+        self.btn_stop.setEnabled(True)
+        self.status.setText(f"Recording… cam0_{ts}.mp4 | cam1_{ts}.mp4")
+
+    def _stop_encoders(self):
+        saved = []
+        for cam_id, (encoder, mp4_path) in list(self.encoders.items()):
+            try:
+                self.cams[cam_id].stop_encoder(encoder)
+                saved.append(os.path.basename(mp4_path))
+            except Exception:
+                pass
+        self.encoders.clear()
+        return saved
+
+    def on_stop(self):
+        if not self.recording:
+            return
+        saved = self._stop_encoders()
+        self.recording = False
+        self.btn_record.setEnabled(True)
+        self.btn_stop.setEnabled(False)
+        self.status.setText("Saved " + " | ".join(saved) if saved else "Preview running")
+
+    def closeEvent(self, event):
+        if self.recording:
+            if QMessageBox.question(self, "Quit", "Recording is in progress. Stop and save before quitting?") \
+                    != QMessageBox.Yes:
+                event.ignore()
+                return
+            self.on_stop()
+        for picam2 in self.cams:
+            try:
+                picam2.stop()
+                picam2.close()
+            except Exception:
+                pass
+        event.accept()
+
+
+if __name__ == "__main__":
+    app = QApplication(sys.argv)
+    window = DualCamQtApp()
+    window.show()
+    # let Python signal handlers (Ctrl+C) run while Qt owns the main loop
+    timer = QTimer()
+    timer.timeout.connect(lambda: None)
+    timer.start(200)
+    sys.exit(app.exec_())
@@ -1,15 +1,18 @@
 #!/usr/bin/env python3
 
+_BYTES_GIB = 1 << 30
+_BYTES_GB = 10**9
+# bytes -> minutes for 1 Mbps, folded once: bytes * 8 bits / 1e6 bps / 60 s
+_MIN_PER_BYTE_AT_1MBPS = 8 / 1_000_000 / 60
+
+
 def minutes_until_full_from_bitrate(storage_gb: float, bitrate_mbps: float, use_gib: bool = True) -> float:
     """
     storage_gb: 80 means 80 GB (decimal) or 80 GiB (binary) depending on use_gib
     bitrate_mbps: megabits per second (e.g., 10 means 10 Mbps)
     use_gib=True => 1 GiB = 1024^3 bytes, else 1 GB = 10^9 bytes
     """
-    bytes_total = storage_gb * (1024**3 if use_gib else 10**9)
-    bits_per_sec = bitrate_mbps * 1_000_000
-    seconds = (bytes_total * 8) / bits_per_sec
-    return seconds / 60
+    return storage_gb * (_BYTES_GIB if use_gib else _BYTES_GB) * _MIN_PER_BYTE_AT_1MBPS / bitrate_mbps
 
 
 def minutes_until_full_uncompressed(storage_gb: float, width: int, height: int, fps: float, bits_per_pixel: float, use_gib: bool = True) -> float:
@@ -20,11 +23,9 @@ def minutes_until_full_uncompressed(storage_gb: float, width: int, height: int,
       RGB24 => bits_per_pixel=24
       YUV420 => bits_per_pixel=12 (approx)
     """
-    bytes_total = storage_gb * (1024**3 if use_gib else 10**9)
-    bytes_per_frame = width * height * (bits_per_pixel / 8.0)
-    bytes_per_sec = bytes_per_frame * fps
-    seconds = bytes_total / bytes_per_sec
-    return seconds / 60
+    bytes_total = storage_gb * (_BYTES_GIB if use_gib else _BYTES_GB)
+    bytes_per_min = width * height * bits_per_pixel * fps * 7.5  # /8 bits, *60 s
+    return bytes_total / bytes_per_min
 
 
 if __name__ == "__main__":
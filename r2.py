@@ -4,13 +4,42 @@ import signal
 import shutil
 import subprocess
 import time
+from fractions import Fraction
 import tkinter as tk
 from tkinter import messagebox
 
+import av
+
 FPS = 30
 WIDTH = 1920
 HEIGHT = 1080
 
+
+def wrap_h264_to_mp4(h264_path: str, mp4_path: str, fps: int):
+    """
+    Wrap (no re-encode) a raw .h264 into MP4 in-process with PyAV, one frame per 1/fps tick.
+    Assumes decode order == display order, i.e. no B-frames (rpicam-vid's encoders never emit them);
+    a B-frame stream would need pts from the parser instead.
+    """
+    time_base = Fraction(1, fps)
+    with av.open(h264_path, format="h264") as src, \
+         av.open(mp4_path, "w", format="mp4", options={"movflags": "+faststart"}) as dst:
+        in_stream = src.streams.video[0]
+        add_from_template = getattr(dst, "add_stream_from_template", None)  # PyAV >= 14
+        out_stream = add_from_template(in_stream) if add_from_template else dst.add_stream(template=in_stream)
+        out_stream.time_base = time_base
+
+        for i, packet in enumerate(src.demux(in_stream)):
+            if packet.size == 0:  # flush packet at EOF
+                continue
+            # Raw H.264 carries no timestamps; one tick per frame at `fps` in decode order
+            packet.pts = packet.dts = i
+            packet.duration = 1
+            packet.time_base = time_base
+            packet.stream = out_stream
+            dst.mux(packet)
+
+
 class RecorderApp:
     def __init__(self, root):
         self.root = root
@@ -44,11 +73,6 @@ class RecorderApp:
             root.destroy()
             return
 
-        if not shutil.which("ffmpeg"):
-            messagebox.showerror("Error", "ffmpeg not found. Install it:\nsudo apt install -y ffmpeg")
-            root.destroy()
-            return
-
         # Start preview immediately and keep it running while idle
         self.start_preview()
 
@@ -169,19 +193,10 @@ class RecorderApp:
         self.status.set("Converting to MP4…")
         self.root.update_idletasks()
 
-        ffmpeg_cmd = [
-            "ffmpeg", "-y",
-            "-r", str(FPS),
-            "-i", self.h264_path,
-            "-c", "copy",
-            "-movflags", "+faststart",
-            self.mp4_path
-        ]
-
         try:
-            subprocess.run(ffmpeg_cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        except subprocess.CalledProcessError:
-            messagebox.showerror("Error", "FFmpeg failed to create MP4.")
+            wrap_h264_to_mp4(self.h264_path, self.mp4_path, FPS)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to create MP4:\n{e}")
             self.status.set("Conversion failed. Restarting preview…")
             self.btn_record.config(state=tk.NORMAL)
             self.btn_stop.config(state=tk.DISABLED)
@@ -1,20 +1,54 @@
 #!/usr/bin/env python3
 import os
 import time
+import threading
 import tkinter as tk
 from tkinter import messagebox
 
-from PIL import Image, ImageTk
+import numpy as np
+from PIL import Image
 
-from picamera2 import Picamera2
+try:
+    import cv2  # NEON-accelerated YUV->RGB
+except ImportError:
+    cv2 = None
+
+from picamera2 import Picamera2, MappedArray
 from picamera2.encoders import H264Encoder
 from picamera2.outputs import FfmpegOutput
 
 
-PREVIEW_SIZE = (640, 360)   # what you see in the app window (fast)
+PREVIEW_SIZE = (320, 180)   # lores stream: 1/4 the pixels of 640x360
+DISPLAY_ZOOM = 2            # shown at 640x360 via Tk's nearest-neighbour zoom
 RECORD_SIZE  = (1920, 1080) # what gets recorded to mp4
 FPS = 30
 BITRATE = 10_000_000        # 10 Mbps (adjust if needed)
+# Binary PPM header for the lores frame: Tk decodes P6 natively, no PIL round-trip
+PPM_HEADER = b"P6\n%d %d\n255\n" % PREVIEW_SIZE
+OUT_DIR = os.path.expanduser("~/Videos")  # resolved once
+TS_FORMAT = "%Y%m%d_%H%M%S"
+
+
+def make_ppm_buffer():
+    """Preallocated PPM (header + RGB pixels) and a writable (h, w, 3) view of its pixel area."""
+    w, h = PREVIEW_SIZE
+    buf = bytearray(PPM_HEADER) + bytearray(w * h * 3)
+    rgb = np.frombuffer(buf, dtype=np.uint8, offset=len(PPM_HEADER)).reshape(h, w, 3)
+    return buf, rgb
+
+
+def yuv420_to_rgb_into(frame, out):
+    """I420 lores frame (h*3/2 x w) -> RGB written into `out` (h x w x 3), no allocation on the cv2 path."""
+    if cv2 is not None:
+        cv2.cvtColor(frame, cv2.COLOR_YUV2RGB_I420, dst=out)
+        return
+    # PIL fallback: merge the planes, chroma upsampled 2x.
+    # frombuffer wraps each (contiguous) plane in place instead of copying like fromarray.
+    w, h = PREVIEW_SIZE
+    y = Image.frombuffer("L", (w, h), frame[:h], "raw", "L", 0, 1)
+    u, v = (Image.frombuffer("L", (w // 2, h // 2), p, "raw", "L", 0, 1).resize((w, h), Image.NEAREST)
+            for p in frame[h:].reshape(2, h // 2, w // 2))
+    np.copyto(out, np.asarray(Image.merge("YCbCr", (y, u, v)).convert("RGB")))
 
 
 class App:
@@ -39,16 +73,34 @@ class App:
 
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
+        # Frames are pushed by the camera (pre_callback) and painted when the self-pipe wakes Tk
+        # One preallocated PPM slot, overwritten in place by the camera callback under _ppm_lock
+        self._ppm_lock = threading.Lock()
+        self._ppm_ready = False
+        self._ppm_buf, self._ppm_rgb = make_ppm_buffer()
+        # One photo for the whole session; each frame reloads its pixels in place
+        self._tk_src = tk.PhotoImage(width=PREVIEW_SIZE[0], height=PREVIEW_SIZE[1])
+        self._tk_image = tk.PhotoImage(width=PREVIEW_SIZE[0] * DISPLAY_ZOOM, height=PREVIEW_SIZE[1] * DISPLAY_ZOOM)
+        self.video_label.configure(image=self._tk_image)
+        # Self-pipe: the camera thread writes a byte per frame and never waits on Tk
+        # (event_generate would, and deadlock against picam2.stop* dispatching to that thread)
+        self._evt_r, self._evt_w = os.pipe()
+        os.set_blocking(self._evt_r, False)
+        os.set_blocking(self._evt_w, False)
+        self.root.tk.createfilehandler(self._evt_r, tk.READABLE, self._on_wake)
+        self.busy = False  # a camera start/stop is running on a worker thread
+
         # --- Camera ---
         try:
             self.picam2 = Picamera2()
             # Use a small "lores" stream for preview (fast), and a larger main stream for recording.
             config = self.picam2.create_video_configuration(
                 main={"size": RECORD_SIZE},
-                lores={"size": PREVIEW_SIZE, "format": "RGB888"},
+                lores={"size": PREVIEW_SIZE, "format": "YUV420"},  # half the bytes of RGB888
                 controls={"FrameRate": FPS},
             )
             self.picam2.configure(config)
+            self.picam2.pre_callback = self._on_frame
             self.picam2.start()
         except Exception as e:
             messagebox.showerror("Camera error", f"Failed to initialize camera:\n{e}")
@@ -60,58 +112,104 @@ class App:
         self.mp4_path = None
 
         self.status.set("Preview running (idle).")
-        self._tk_image = None
 
-        # Start UI update loop
+    def _on_frame(self, request):
+        """Camera thread: stash the new lores frame and wake the Tk loop."""
+        try:
+            # Convert straight out of the mapped DMA buffer into the preallocated PPM
+            with MappedArray(request, "lores") as m, self._ppm_lock:
+                yuv420_to_rgb_into(m.array, self._ppm_rgb)
+                self._ppm_ready = True
+            os.write(self._evt_w, b"\x00")
+        except Exception:
+            pass  # includes a pipe already full of wakeups: the frame is still stashed
+
+    def _on_wake(self, fd, mask):
+        try:
+            os.read(fd, 4096)
+        except BlockingIOError:
+            pass
         self.update_preview()
 
-    def update_preview(self):
-        """Grab a frame and show it inside the Tk window."""
+    def _close_evt_pipe(self):
+        self.root.tk.deletefilehandler(self._evt_r)
+        os.close(self._evt_r)
+        os.close(self._evt_w)
+
+    def _run_camera_op(self, op, done):
+        """Run a picam2 start/stop on a worker thread (they wait on the camera thread), then done(err) on Tk."""
+        def work():
+            err = None
+            try:
+                op()
+            except Exception as e:
+                err = e
+            self.root.after(0, done, err)
+        self.busy = True
+        threading.Thread(target=work, daemon=True).start()
+
+    def _take_ppm(self):
+        # Tk needs an immutable copy; only frames that actually get painted pay for it
+        with self._ppm_lock:
+            return bytes(self._ppm_buf) if self._ppm_ready else None
+
+    def update_preview(self, event=None):
+        """Show the most recent frame inside the Tk window."""
+        ppm = self._take_ppm()
+        if ppm is None:
+            return
         try:
-            frame = self.picam2.capture_array("lores")  # RGB888 numpy array
-            img = Image.fromarray(frame)
-            self._tk_image = ImageTk.PhotoImage(img)
-            self.video_label.configure(image=self._tk_image)
+            self._tk_src.configure(data=ppm, format="PPM")
+            self._tk_image.tk.call(self._tk_image, "copy", self._tk_src, "-zoom", DISPLAY_ZOOM)
         except Exception:
             # Don’t crash the whole UI if one frame fails; just try again.
             pass
 
-        # Schedule next frame
-        self.root.after(int(1000 / FPS), self.update_preview)
-
     def start_recording(self):
-        if self.recording:
+        if self.recording or self.busy:
             return
 
-        out_dir = os.path.expanduser("~/Videos")
-        os.makedirs(out_dir, exist_ok=True)
-        ts = time.strftime("%Y%m%d_%H%M%S")
-        self.mp4_path = os.path.join(out_dir, f"recording_{ts}.mp4")
+        os.makedirs(OUT_DIR, exist_ok=True)
+        ts = time.strftime(TS_FORMAT)
+        self.mp4_path = os.path.join(OUT_DIR, f"recording_{ts}.mp4")
 
-        try:
+        def start():
             self.encoder = H264Encoder(bitrate=BITRATE)
-            self.output = FfmpegOutput(self.mp4_path)  # uses ffmpeg to mux into MP4
+            # ffmpeg only muxes (-c:v copy) the encoder's H.264 into MP4; extra args ride in the "filename"
+            self.output = FfmpegOutput(f"-movflags +faststart {self.mp4_path}", audio=False)
             self.picam2.start_recording(self.encoder, self.output)
-        except Exception as e:
+
+        self.btn_record.config(state=tk.DISABLED)
+        self.status.set("Starting recording…")
+        self._run_camera_op(start, self._on_started)
+
+    def _on_started(self, err):
+        self.busy = False
+        if err is not None:
             self.encoder = None
             self.output = None
-            messagebox.showerror("Recording error", f"Failed to start recording:\n{e}")
+            self.status.set("Preview running (idle).")
+            self.btn_record.config(state=tk.NORMAL)
+            messagebox.showerror("Recording error", f"Failed to start recording:\n{err}")
             return
 
         self.recording = True
         self.status.set(f"Recording… {os.path.basename(self.mp4_path)}")
-        self.btn_record.config(state=tk.DISABLED)
         self.btn_stop.config(state=tk.NORMAL)
 
     def stop_recording(self):
-        if not self.recording:
+        if not self.recording or self.busy:
             return
 
-        try:
-            self.picam2.stop_recording()
-        except Exception as e:
-            messagebox.showerror("Recording error", f"Failed to stop recording cleanly:\n{e}")
-            # still try to recover UI state
+        self.btn_stop.config(state=tk.DISABLED)
+        self.status.set("Stopping…")
+        self._run_camera_op(self.picam2.stop_recording, self._on_stopped)
+
+    def _on_stopped(self, err):
+        self.busy = False
+        if err is not None:
+            messagebox.showerror("Recording error", f"Failed to stop recording cleanly:\n{err}")
+            # still recover UI state
 
         self.recording = False
         self.encoder = None
@@ -119,25 +217,32 @@ class App:
 
         self.status.set(f"Saved: {self.mp4_path}")
         self.btn_record.config(state=tk.NORMAL)
-        self.btn_stop.config(state=tk.DISABLED)
 
     def on_close(self):
-        if self.recording:
-            if messagebox.askyesno("Quit", "Recording is in progress. Stop and save before quitting?"):
-                self.stop_recording()
-            else:
-                # If they insist, try to stop anyway to release camera
-                try:
+        if self.busy:
+            return  # a start/stop is in flight; closing again once it lands is safe
+        recording = self.recording
+        save = recording and messagebox.askyesno("Quit", "Recording is in progress. Stop and save before quitting?")
+        # If they decline, still stop to release the camera; only a save reports errors
+
+        # Detach before stopping so no frame callback is mid-flight during shutdown
+        self.picam2.pre_callback = None
+
+        def shutdown():
+            try:
+                if recording:
                     self.picam2.stop_recording()
-                except Exception:
-                    pass
+            finally:
+                self.picam2.stop()
 
-        try:
-            self.picam2.stop()
-        except Exception:
-            pass
+        def done(err):
+            if err is not None and save:
+                messagebox.showerror("Recording error", f"Failed to stop recording cleanly:\n{err}")
+            self._close_evt_pipe()
+            self.root.destroy()
 
-        self.root.destroy()
+        self.status.set("Closing…")
+        self._run_camera_op(shutdown, done)
 
 
 if __name__ == "__main__":
@@ -5,16 +5,49 @@ import threading
 import tkinter as tk
 from tkinter import messagebox
 
-from PIL import Image, ImageTk
+import numpy as np
+from PIL import Image
 
-from picamera2 import Picamera2
+try:
+    import cv2  # NEON-accelerated YUV->RGB
+except ImportError:
+    cv2 = None
+
+from picamera2 import Picamera2, MappedArray
 from picamera2.encoders import H264Encoder
 from picamera2.outputs import FfmpegOutput
 
-PREVIEW_SIZE = (640, 360)
+PREVIEW_SIZE = (320, 180)  # lores stream: 1/4 the pixels of 640x360
+DISPLAY_ZOOM = 2  # shown at 640x360 via Tk's nearest-neighbour zoom
 RECORD_SIZE  = (1920, 1080)
 FPS = 30
 BITRATE = 10_000_000  # 10 Mbps
+# Binary PPM header for the lores frame: Tk decodes P6 natively, no PIL round-trip
+PPM_HEADER = b"P6\n%d %d\n255\n" % PREVIEW_SIZE
+OUT_DIR = os.path.expanduser("~/Videos")  # resolved once
+TS_FORMAT = "%Y%m%d_%H%M%S"
+
+
+def make_ppm_buffer():
+    """Preallocated PPM (header + RGB pixels) and a writable (h, w, 3) view of its pixel area."""
+    w, h = PREVIEW_SIZE
+    buf = bytearray(PPM_HEADER) + bytearray(w * h * 3)
+    rgb = np.frombuffer(buf, dtype=np.uint8, offset=len(PPM_HEADER)).reshape(h, w, 3)
+    return buf, rgb
+
+
+def yuv420_to_rgb_into(frame, out):
+    """I420 lores frame (h*3/2 x w) -> RGB written into `out` (h x w x 3), no allocation on the cv2 path."""
+    if cv2 is not None:
+        cv2.cvtColor(frame, cv2.COLOR_YUV2RGB_I420, dst=out)
+        return
+    # PIL fallback: merge the planes, chroma upsampled 2x.
+    # frombuffer wraps each (contiguous) plane in place instead of copying like fromarray.
+    w, h = PREVIEW_SIZE
+    y = Image.frombuffer("L", (w, h), frame[:h], "raw", "L", 0, 1)
+    u, v = (Image.frombuffer("L", (w // 2, h // 2), p, "raw", "L", 0, 1).resize((w, h), Image.NEAREST)
+            for p in frame[h:].reshape(2, h // 2, w // 2))
+    np.copyto(out, np.asarray(Image.merge("YCbCr", (y, u, v)).convert("RGB")))
 
 
 class App:
@@ -31,6 +64,7 @@ class App:
 
         self.btn_record = tk.Button(btn_frame, text="Record", width=15, command=self.start_recording)
         self.btn_stop   = tk.Button(btn_frame, text="Stop",   width=15, command=self.stop_recording, state=tk.DISABLED)
+        self._btn_state = (tk.NORMAL, tk.DISABLED)  # last applied (record, stop) states
         self.btn_record.pack(side=tk.LEFT, padx=10)
         self.btn_stop.pack(side=tk.LEFT, padx=10)
 
@@ -46,90 +80,131 @@ class App:
         self.output = None
         self.mp4_path = None
 
+        # --- Preview frame storage (filled by the camera's pre_callback) ---
+        self.running = True
+        # Double-buffered PPM: the camera fills the buffer Tk isn't reading, then flips
+        # _ready_idx (a single attribute store, atomic under the GIL) -> no lock
+        self._ppm_bufs = (make_ppm_buffer(), make_ppm_buffer())
+        self._ready_idx = None  # no frame yet
+        # One photo for the whole session; each frame reloads its pixels in place
+        self._tk_src = tk.PhotoImage(width=PREVIEW_SIZE[0], height=PREVIEW_SIZE[1])
+        self._tk_image = tk.PhotoImage(width=PREVIEW_SIZE[0] * DISPLAY_ZOOM, height=PREVIEW_SIZE[1] * DISPLAY_ZOOM)
+        self.video_label.configure(image=self._tk_image)
+        # Self-pipe: the camera thread writes a byte per frame and never waits on Tk
+        # (event_generate would, and deadlock against picam2.stop* dispatching to that thread)
+        self._evt_r, self._evt_w = os.pipe()
+        os.set_blocking(self._evt_r, False)
+        os.set_blocking(self._evt_w, False)
+        self.root.tk.createfilehandler(self._evt_r, tk.READABLE, self._on_wake)
+
         # --- Camera init ---
         try:
             self.picam2 = Picamera2()
             config = self.picam2.create_video_configuration(
                 main={"size": RECORD_SIZE},
-                lores={"size": PREVIEW_SIZE, "format": "RGB888"},
+                lores={"size": PREVIEW_SIZE, "format": "YUV420"},  # half the bytes of RGB888
                 controls={"FrameRate": FPS},
             )
             self.picam2.configure(config)
+            self.picam2.pre_callback = self._on_frame
             self.picam2.start()
         except Exception as e:
             messagebox.showerror("Camera error", f"Failed to initialize camera:\n{e}")
             raise
 
-        # --- Preview frame worker ---
-        self.running = True
-        self.frame_lock = threading.Lock()
-        self.latest_frame = None
-        self._tk_image = None
+        self.status.set("Preview running (idle).")
 
-        threading.Thread(target=self._frame_worker, daemon=True).start()
+    def set_buttons(self, record_enabled: bool, stop_enabled: bool):
+        new = (tk.NORMAL if record_enabled else tk.DISABLED, tk.NORMAL if stop_enabled else tk.DISABLED)
+        # Each .config is a Tcl round-trip; only touch the buttons whose state actually changes
+        if new[0] != self._btn_state[0]:
+            self.btn_record.config(state=new[0])
+        if new[1] != self._btn_state[1]:
+            self.btn_stop.config(state=new[1])
+        self._btn_state = new
+
+    def _on_frame(self, request):
+        """Camera thread: store each new lores frame and wake Tk through the self-pipe."""
+        if not self.running:
+            return
+        try:
+            # Convert straight out of the mapped DMA buffer into the preallocated PPM
+            idx = 1 if self._ready_idx == 0 else 0
+            with MappedArray(request, "lores") as m:
+                yuv420_to_rgb_into(m.array, self._ppm_bufs[idx][1])
+            self._ready_idx = idx
+            os.write(self._evt_w, b"\x00")
+        except Exception:
+            pass  # includes a pipe already full of wakeups: the frame is still stashed
 
-        self.status.set("Preview running (idle).")
+    def _on_wake(self, fd, mask):
+        try:
+            os.read(fd, 4096)
+        except BlockingIOError:
+            pass
         self._ui_preview_loop()
 
-    def set_buttons(self, record_enabled: bool, stop_enabled: bool):
-        self.btn_record.config(state=tk.NORMAL if record_enabled else tk.DISABLED)
-        self.btn_stop.config(state=tk.NORMAL if stop_enabled else tk.DISABLED)
+    def _close_evt_pipe(self):
+        self.root.tk.deletefilehandler(self._evt_r)
+        os.close(self._evt_r)
+        os.close(self._evt_w)
 
-    def _frame_worker(self):
-        """Continuously capture preview frames in a background thread."""
-        while self.running:
-            try:
-                frame = self.picam2.capture_array("lores")  # numpy array (RGB)
-                with self.frame_lock:
-                    self.latest_frame = frame
-            except Exception:
-                time.sleep(0.05)
+    def _take_ppm(self):
+        # Tk needs an immutable copy; only frames that actually get painted pay for it
+        idx = self._ready_idx
+        return None if idx is None else bytes(self._ppm_bufs[idx][0])
 
-    def _ui_preview_loop(self):
+    def _ui_preview_loop(self, event=None):
         """Update Tk image from the most recent frame (never blocks)."""
         try:
-            with self.frame_lock:
-                frame = self.latest_frame
-            if frame is not None:
-                img = Image.fromarray(frame)
-                self._tk_image = ImageTk.PhotoImage(img)
-                self.video_label.configure(image=self._tk_image)
+            ppm = self._take_ppm()
+            if ppm is not None:
+                self._tk_src.configure(data=ppm, format="PPM")
+                self._tk_image.tk.call(self._tk_image, "copy", self._tk_src, "-zoom", DISPLAY_ZOOM)
         except Exception:
             pass
 
-        self.root.after(int(1000 / FPS), self._ui_preview_loop)
-
     def start_recording(self):
         if self.recording or self.busy:
             return
 
-        out_dir = os.path.expanduser("~/Videos")
-        os.makedirs(out_dir, exist_ok=True)
-        ts = time.strftime("%Y%m%d_%H%M%S")
-        self.mp4_path = os.path.join(out_dir, f"recording_{ts}.mp4")
+        os.makedirs(OUT_DIR, exist_ok=True)
+        ts = time.strftime(TS_FORMAT)
+        self.mp4_path = os.path.join(OUT_DIR, f"recording_{ts}.mp4")
 
         self.busy = True
         self.status.set("Starting recording…")
         self.set_buttons(False, False)
         self.root.update_idletasks()
 
+        # start_recording waits on the camera thread too, so it runs off the Tk thread like the stop
+        threading.Thread(target=self._start_worker, daemon=True).start()
+
+    def _start_worker(self):
+        err = None
         try:
             self.encoder = H264Encoder(bitrate=BITRATE)
-            self.output = FfmpegOutput(self.mp4_path)
+            # mux only (-c:v copy), never re-encode; extra ffmpeg args ride in the "filename"
+            self.output = FfmpegOutput(f"-movflags +faststart {self.mp4_path}", audio=False)
             self.picam2.start_recording(self.encoder, self.output)
-
-            self.recording = True
-            self.status.set(f"Recording… {os.path.basename(self.mp4_path)}")
-            self.set_buttons(False, True)
         except Exception as e:
-            self.recording = False
-            self.encoder = None
-            self.output = None
-            self.status.set("Preview running (idle).")
-            self.set_buttons(True, False)
-            messagebox.showerror("Recording error", f"Failed to start recording:\n{e}")
-        finally:
+            err = e
+
+        def done():
             self.busy = False
+            if err is not None:
+                self.recording = False
+                self.encoder = None
+                self.output = None
+                self.status.set("Preview running (idle).")
+                self.set_buttons(True, False)
+                messagebox.showerror("Recording error", f"Failed to start recording:\n{err}")
+            else:
+                self.recording = True
+                self.status.set(f"Recording… {os.path.basename(self.mp4_path)}")
+                self.set_buttons(False, True)
+
+        self.root.after(0, done)
 
     def stop_recording(self):
         if not self.recording or self.busy:
@@ -180,17 +255,31 @@ class App:
                 self.stop_recording()
                 return
 
+        # Detach before stopping: clearing `running` can't drain a callback already in flight
         self.running = False
-        try:
-            if self.recording:
-                self.picam2.stop_recording()
-        except Exception:
-            pass
-        try:
-            self.picam2.stop()
-        except Exception:
-            pass
-        self.root.destroy()
+        self.picam2.pre_callback = None
+        self.busy = True
+        self.status.set("Closing…")
+        self.set_buttons(False, False)
+        recording = self.recording
+
+        def shutdown():
+            try:
+                if recording:
+                    self.picam2.stop_recording()
+            except Exception:
+                pass
+            try:
+                self.picam2.stop()
+            except Exception:
+                pass
+            self.root.after(0, done)
+
+        def done():
+            self._close_evt_pipe()
+            self.root.destroy()
+
+        threading.Thread(target=shutdown, daemon=True).start()
 
 
 if __name__ == "__main__":
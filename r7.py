@@ -7,21 +7,73 @@ import subprocess
 import tkinter as tk
 from tkinter import messagebox
 
-from PIL import Image, ImageTk
-from picamera2 import Picamera2
-from picamera2.encoders import H264Encoder
+import numpy as np
+from PIL import Image
+
+try:
+    import cv2  # NEON-accelerated YUV->RGB
+except ImportError:
+    cv2 = None
+from picamera2 import Picamera2, MappedArray
+from picamera2.encoders import H264Encoder, JpegEncoder
 from picamera2.outputs import FileOutput
 
-PREVIEW_SIZE = (640, 360)
+PREVIEW_SIZE = (320, 180)  # lores stream: 1/4 the pixels of 640x360
+DISPLAY_ZOOM = 2  # shown at 640x360 via Tk's nearest-neighbour zoom
 RECORD_SIZE  = (1920, 1080)
 FPS = 30
 BITRATE = 10_000_000  # 10 Mbps
-
-
-def ffmpeg_wrap_h264_to_mp4(h264_path: str, mp4_path: str, fps: int):
-    # Fast wrap (no re-encode)
-    cmd = ["ffmpeg", "-y", "-r", str(fps), "-i", h264_path, "-c", "copy", "-movflags", "+faststart", mp4_path]
-    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+# Binary PPM header for the lores frame: Tk decodes P6 natively, no PIL round-trip
+PPM_HEADER = b"P6\n%d %d\n255\n" % PREVIEW_SIZE
+OUT_DIR = os.path.expanduser("~/Videos")  # resolved once
+TS_FORMAT = "%Y%m%d_%H%M%S"
+WRITEBACK_INTERVAL = 1.0  # s between flushing ffmpeg's writes out of the page cache
+
+
+def _pi_model() -> str:
+    try:
+        with open("/proc/device-tree/model") as f:
+            return f.read().rstrip("\x00")
+    except OSError:
+        return ""
+
+
+# Pi 5 has no H.264 block (picamera2 encodes in software via libav, several frames of latency);
+# MJPEG has no inter-frame dependency, so use it there (trade-off: files are ~3x bigger at similar quality).
+CODEC = "mjpeg" if any(m in _pi_model() for m in ("Pi 5", "Module 5", "Pi 500")) else "h264"
+REC_EXT = ".mkv" if CODEC == "mjpeg" else ".mp4"
+
+
+def make_ppm_buffer():
+    """Preallocated PPM (header + RGB pixels) and a writable (h, w, 3) view of its pixel area."""
+    w, h = PREVIEW_SIZE
+    buf = bytearray(PPM_HEADER) + bytearray(w * h * 3)
+    rgb = np.frombuffer(buf, dtype=np.uint8, offset=len(PPM_HEADER)).reshape(h, w, 3)
+    return buf, rgb
+
+
+def yuv420_to_rgb_into(frame, out):
+    """I420 lores frame (h*3/2 x w) -> RGB written into `out` (h x w x 3), no allocation on the cv2 path."""
+    if cv2 is not None:
+        cv2.cvtColor(frame, cv2.COLOR_YUV2RGB_I420, dst=out)
+        return
+    # PIL fallback: merge the planes, chroma upsampled 2x.
+    # frombuffer wraps each (contiguous) plane in place instead of copying like fromarray.
+    w, h = PREVIEW_SIZE
+    y = Image.frombuffer("L", (w, h), frame[:h], "raw", "L", 0, 1)
+    u, v = (Image.frombuffer("L", (w // 2, h // 2), p, "raw", "L", 0, 1).resize((w, h), Image.NEAREST)
+            for p in frame[h:].reshape(2, h // 2, w // 2))
+    np.copyto(out, np.asarray(Image.merge("YCbCr", (y, u, v)).convert("RGB")))
+
+
+def ffmpeg_mux_cmd(out_path: str):
+    # Encoder output is piped straight in: the raw stream never touches the disk
+    # -progress pipe:2 streams key=value progress on stderr alongside any errors
+    cmd = ["ffmpeg", "-y", "-loglevel", "error", "-nostats", "-progress", "pipe:2",
+           "-f", CODEC, "-r", str(FPS), "-i", "pipe:0", "-c", "copy"]
+    if CODEC == "mjpeg":
+        return cmd + ["-f", "matroska", out_path]
+    return cmd + ["-movflags", "+faststart", "-f", "mp4", out_path]
 
 
 class CameraWorker(threading.Thread):
@@ -29,16 +81,20 @@ class CameraWorker(threading.Thread):
     Owns Picamera2. GUI never calls picam2 directly.
     Communicates using:
       - cmd_q: commands from GUI
-      - evt_q: events back to GUI
-      - latest_frame: last preview frame (lores)
+      - evt_q: events back to GUI (plus one byte on evt_fd per event, to wake Tk)
+      - get_latest_ppm(): last preview frame (lores) as PPM bytes, set from picamera2's pre_callback;
+        each stored frame also writes a byte to evt_fd, so the camera thread never waits on Tk
     """
-    def __init__(self, cmd_q: queue.Queue, evt_q: queue.Queue):
+    def __init__(self, cmd_q: queue.Queue, evt_q: queue.Queue, evt_fd: int = None):
         super().__init__(daemon=True)
         self.cmd_q = cmd_q
         self.evt_q = evt_q
+        self.evt_fd = evt_fd
 
-        self.frame_lock = threading.Lock()
-        self.latest_frame = None
+        # Double-buffered PPM: the camera fills the buffer Tk isn't reading, then flips
+        # _ready_idx (a single attribute store, atomic under the GIL) -> no lock
+        self._ppm_bufs = (make_ppm_buffer(), make_ppm_buffer())
+        self._ready_idx = None  # no frame yet
 
         self.running = True
         self.recording = False
@@ -47,88 +103,179 @@ class CameraWorker(threading.Thread):
         self.encoder = None
         self.output = None
 
-        self.current_h264 = None
-        self.current_mp4 = None
+        self.current_out = None
+        self.ffmpeg_proc = None  # muxes the encoder's stream into current_out while recording
+        self.ffmpeg_watcher = None  # drains ffmpeg's stderr: progress -> status, keeps the last error line
+        self.ffmpeg_error = None
+
+    def _post(self, evt):
+        self.evt_q.put(evt)
+        self._wake()
+
+    def _wake(self):
+        if self.evt_fd is not None:
+            try:
+                os.write(self.evt_fd, b"\x00")
+            except (BlockingIOError, OSError):
+                pass  # pipe already full of wakeups (or GUI gone): the event is still queued
 
     def run(self):
         try:
             self.picam2 = Picamera2()
             config = self.picam2.create_video_configuration(
                 main={"size": RECORD_SIZE},
-                lores={"size": PREVIEW_SIZE, "format": "RGB888"},
+                lores={"size": PREVIEW_SIZE, "format": "YUV420"},  # half the bytes of RGB888
                 controls={"FrameRate": FPS},
             )
             self.picam2.configure(config)
+            self.picam2.pre_callback = self._on_request
             self.picam2.start()  # start preview pipeline
-            self.evt_q.put(("status", "Preview running (idle)."))
-            self.evt_q.put(("ready", None))
+            self._post(("status", "Preview running (idle)."))
+            self._post(("ready", None))
         except Exception as e:
-            self.evt_q.put(("fatal", f"Failed to initialize camera: {e}"))
+            self._post(("fatal", f"Failed to initialize camera: {e}"))
             return
 
-        target_dt = 1.0 / FPS
-
+        # Preview frames arrive via _on_request (camera-paced), so this loop only
+        # dispatches commands: block until one arrives, no sleep/poll.
         while self.running:
-            # 1) Handle all pending commands first (start/stop/shutdown)
-            try:
-                while True:
-                    cmd, payload = self.cmd_q.get_nowait()
-                    if cmd == "shutdown":
-                        self._shutdown()
-                        return
-                    elif cmd == "start":
-                        self._start_recording(payload)
-                    elif cmd == "stop":
-                        self._stop_recording_and_resume_preview()
-            except queue.Empty:
-                pass
-
-            # 2) Grab a preview frame (lores)
-            try:
-                frame = self.picam2.capture_array("lores")
-                with self.frame_lock:
-                    self.latest_frame = frame
-            except Exception:
-                # If pipeline is restarting, brief failures can happen; just keep looping.
-                time.sleep(0.02)
+            cmd, payload = self.cmd_q.get()
+            if cmd == "shutdown":
+                self._shutdown()
+                return
+            elif cmd == "start":
+                self._start_recording(payload)
+            elif cmd == "stop":
+                self._stop_recording_and_resume_preview()
 
-            time.sleep(target_dt)
+    def _on_request(self, request):
+        try:
+            # Convert straight out of the mapped DMA buffer into the preallocated PPM
+            idx = 1 if self._ready_idx == 0 else 0
+            with MappedArray(request, "lores") as m:
+                yuv420_to_rgb_into(m.array, self._ppm_bufs[idx][1])
+            self._ready_idx = idx
+            self._wake()
+        except Exception:
+            # If pipeline is restarting, brief failures can happen; just skip the frame.
+            pass
 
-    def get_latest_frame(self):
-        with self.frame_lock:
-            return self.latest_frame
+    def get_latest_ppm(self):
+        # Tk needs an immutable copy; only frames that actually get painted pay for it
+        idx = self._ready_idx
+        return None if idx is None else bytes(self._ppm_bufs[idx][0])
 
-    def _start_recording(self, paths):
+    def _start_recording(self, out_path):
         if self.recording:
             return
-        h264_path, mp4_path = paths
-        self.current_h264 = h264_path
-        self.current_mp4 = mp4_path
+        self.current_out = out_path
 
         try:
-            self.evt_q.put(("status", "Starting recording…"))
-
-            self.encoder = H264Encoder(bitrate=BITRATE)
-            self.output = FileOutput(h264_path)
+            self._post(("status", "Starting recording…"))
+
+            self.ffmpeg_proc = subprocess.Popen(
+                ffmpeg_mux_cmd(out_path),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                bufsize=0,  # raw stdin: each encoded frame goes straight to ffmpeg, nothing left to flush on stop
+            )
+            self.encoder = JpegEncoder() if CODEC == "mjpeg" else H264Encoder(bitrate=BITRATE)
+            self.output = FileOutput(self.ffmpeg_proc.stdin)
+            self.ffmpeg_error = None
+            self.ffmpeg_watcher = threading.Thread(
+                target=self._watch_ffmpeg, args=(self.ffmpeg_proc, os.path.basename(out_path)), daemon=True)
+            self.ffmpeg_watcher.start()
+            threading.Thread(target=self._pace_writeback, args=(self.ffmpeg_proc, out_path), daemon=True).start()
 
             # start_recording may (re)start camera/encoder internally depending on version
             self.picam2.start_recording(self.encoder, self.output)
             self.recording = True
 
-            self.evt_q.put(("recording", True))
-            self.evt_q.put(("status", f"Recording… {os.path.basename(mp4_path)}"))
+            self._post(("recording", True))
+            self._post(("status", f"Recording… {os.path.basename(out_path)}"))
         except Exception as e:
             self.recording = False
             self.encoder = None
             self.output = None
-            self.evt_q.put(("recording", False))
-            self.evt_q.put(("error", f"Failed to start recording: {e}"))
+            self._finish_ffmpeg()
+            self._post(("recording", False))
+            self._post(("error", f"Failed to start recording: {e}"))
+
+    def _watch_ffmpeg(self, proc, name):
+        # Runs until ffmpeg closes stderr; reading it also keeps the pipe from filling up and stalling ffmpeg
+        last_shown = -1
+        for raw in proc.stderr:
+            line = raw.decode(errors="replace").strip()
+            key, sep, val = line.partition("=")
+            if not sep:
+                if line:
+                    self.ffmpeg_error = line
+                continue
+            if key == "out_time_ms" and proc is self.ffmpeg_proc and self.recording:
+                try:
+                    secs = int(val) // 1_000_000  # ffmpeg reports out_time_ms in microseconds
+                except ValueError:
+                    continue
+                if secs != last_shown:
+                    last_shown = secs
+                    self._post(("status", f"Recording… {name} ({secs // 60:02d}:{secs % 60:02d} muxed)"))
+
+    def _pace_writeback(self, proc, out_path):
+        # Flush what ffmpeg has written every WRITEBACK_INTERVAL and drop it from the page cache,
+        # so the SD card sees a steady trickle instead of multi-MB dirty-page bursts that stall the encoder
+        fd = None
+        flushed = 0
+        try:
+            while proc is self.ffmpeg_proc and proc.poll() is None:
+                time.sleep(WRITEBACK_INTERVAL)
+                if fd is None:
+                    try:
+                        fd = os.open(out_path, os.O_RDONLY)  # ffmpeg creates it after probing the stream
+                    except FileNotFoundError:
+                        continue
+                    if hasattr(os, "posix_fadvise"):
+                        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                size = os.fstat(fd).st_size
+                if size <= flushed:
+                    continue
+                os.fdatasync(fd)
+                if hasattr(os, "posix_fadvise"):
+                    os.posix_fadvise(fd, flushed, size - flushed, os.POSIX_FADV_DONTNEED)
+                flushed = size
+        except OSError:
+            pass
+        finally:
+            if fd is not None:
+                os.close(fd)
+
+    def _finish_ffmpeg(self, status=None):
+        # EOF on stdin lets ffmpeg write the moov atom (+faststart) and exit
+        proc = self.ffmpeg_proc
+        self.ffmpeg_proc = None  # detached first so the watcher stops posting progress
+        if proc is None:
+            return None
+        if status:
+            self._post(("status", status))
+        try:
+            proc.stdin.close()
+        except Exception:
+            pass
+        try:
+            rc = proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            rc = proc.wait()
+        watcher, self.ffmpeg_watcher = self.ffmpeg_watcher, None
+        if watcher is not None:
+            watcher.join(timeout=1)
+        return rc
 
     def _stop_recording_and_resume_preview(self):
         if not self.recording:
             return
 
-        self.evt_q.put(("status", "Stopping recording…"))
+        self._post(("status", "Stopping recording…"))
         err = None
 
         try:
@@ -136,6 +283,12 @@ class CameraWorker(threading.Thread):
         except Exception as e:
             err = f"stop_recording failed: {e}"
 
+        rc = self._finish_ffmpeg(f"Saving {REC_EXT[1:].upper()}…")
+        if rc and err is None:
+            err = f"FFmpeg mux failed (exit code {rc})"
+            if self.ffmpeg_error:
+                err += f": {self.ffmpeg_error}"
+
         # IMPORTANT: stop_recording can stop the camera pipeline;
         # restart it so preview continues.  [oai_citation:1‡grobotronics.com](https://grobotronics.com/images/companies/1/content_processor/PDF/picamera2-manual.pdf?srsltid=AfmBOooTHgnNhiH6rc4kVFrtq-_RB-Fa2Vpvm1sxJtgV_pZqKD9ggRPj&utm_source=chatgpt.com)
         try:
@@ -149,44 +302,28 @@ class CameraWorker(threading.Thread):
         self.recording = False
         self.encoder = None
         self.output = None
-        self.evt_q.put(("recording", False))
+        self._post(("recording", False))
 
         if err:
-            self.evt_q.put(("error", err))
-            self.evt_q.put(("status", "Preview running (idle)."))
-            self.evt_q.put(("ready", None))
+            self._post(("error", err))
+            self._post(("status", "Preview running (idle)."))
+            self._post(("ready", None))
             return
 
-        # Convert h264 -> mp4 in a separate thread (don’t block camera/preview)
-        h264_path = self.current_h264
-        mp4_path = self.current_mp4
-
-        def convert():
-            try:
-                self.evt_q.put(("status", "Saving MP4…"))
-                ffmpeg_wrap_h264_to_mp4(h264_path, mp4_path, FPS)
-                try:
-                    os.remove(h264_path)
-                except OSError:
-                    pass
-                self.evt_q.put(("saved", mp4_path))
-                self.evt_q.put(("status", "Preview running (idle)."))
-                self.evt_q.put(("ready", None))
-            except Exception as e:
-                self.evt_q.put(("error", f"FFmpeg conversion failed: {e}"))
-                self.evt_q.put(("status", "Preview running (idle)."))
-                self.evt_q.put(("ready", None))
-
-        threading.Thread(target=convert, daemon=True).start()
+        self._post(("saved", self.current_out))
+        self._post(("status", "Preview running (idle)."))
+        self._post(("ready", None))
 
     def _shutdown(self):
         self.running = False
+        self.evt_fd = None  # GUI is going away
         try:
             if self.recording:
                 try:
                     self.picam2.stop_recording()
                 except Exception:
                     pass
+                self._finish_ffmpeg()
             if self.picam2:
                 self.picam2.stop()
         except Exception:
@@ -206,10 +343,12 @@ class App:
 
         self.btn_record = tk.Button(btn_frame, text="Record", width=15, command=self.on_record)
         self.btn_stop   = tk.Button(btn_frame, text="Stop",   width=15, command=self.on_stop, state=tk.DISABLED)
+        self._btn_state = (tk.NORMAL, tk.DISABLED)  # last applied (record, stop) states
         self.btn_record.pack(side=tk.LEFT, padx=10)
         self.btn_stop.pack(side=tk.LEFT, padx=10)
 
-        self.status = tk.StringVar(value="Starting…")
+        self._last_status = "Starting…"
+        self.status = tk.StringVar(value=self._last_status)
         tk.Label(root, textvariable=self.status).pack(pady=(0, 10))
 
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
@@ -217,27 +356,58 @@ class App:
         self.cmd_q = queue.Queue()
         self.evt_q = queue.Queue()
 
-        self.worker = CameraWorker(self.cmd_q, self.evt_q)
-        self.worker.start()
-
-        self._tk_image = None
+        # One photo for the whole session; each frame reloads its pixels in place
+        self._tk_src = tk.PhotoImage(width=PREVIEW_SIZE[0], height=PREVIEW_SIZE[1])
+        self._tk_image = tk.PhotoImage(width=PREVIEW_SIZE[0] * DISPLAY_ZOOM, height=PREVIEW_SIZE[1] * DISPLAY_ZOOM)
+        self.video_label.configure(image=self._tk_image)
         self.recording = False
         self.ready = False
 
+        # Self-pipe: the worker writes a byte per event, Tk wakes only when the read end is readable
+        self._evt_r, self._evt_w = os.pipe()
+        os.set_blocking(self._evt_r, False)
+        os.set_blocking(self._evt_w, False)
+        self.root.tk.createfilehandler(self._evt_r, tk.READABLE, self._on_evt)
+
+        self.worker = CameraWorker(self.cmd_q, self.evt_q, evt_fd=self._evt_w)
+        self.worker.start()
+
+    def _on_evt(self, fd, mask):
+        try:
+            os.read(fd, 4096)
+        except BlockingIOError:
+            pass
         self.poll_events()
+        # Frames wake the same pipe without queuing an event; repaint the latest one
         self.update_preview()
 
+    def _close_evt_pipe(self):
+        self.root.tk.deletefilehandler(self._evt_r)
+        os.close(self._evt_r)
+
     def set_buttons(self):
         # Record allowed only when ready and not recording
-        self.btn_record.config(state=tk.NORMAL if (self.ready and not self.recording) else tk.DISABLED)
-        self.btn_stop.config(state=tk.NORMAL if self.recording else tk.DISABLED)
+        new = (tk.NORMAL if (self.ready and not self.recording) else tk.DISABLED,
+               tk.NORMAL if self.recording else tk.DISABLED)
+        # Each .config is a Tcl round-trip; only touch the buttons whose state actually changes
+        if new[0] != self._btn_state[0]:
+            self.btn_record.config(state=new[0])
+        if new[1] != self._btn_state[1]:
+            self.btn_stop.config(state=new[1])
+        self._btn_state = new
+
+    def _set_status(self, text):
+        # StringVar.set is a Tcl call; the worker re-posts the same status a lot
+        if text != self._last_status:
+            self._last_status = text
+            self.status.set(text)
 
     def poll_events(self):
         try:
             while True:
                 typ, payload = self.evt_q.get_nowait()
                 if typ == "status":
-                    self.status.set(payload)
+                    self._set_status(payload)
                 elif typ == "ready":
                     self.ready = True
                     self.set_buttons()
@@ -246,7 +416,7 @@ class App:
                     self.ready = not self.recording  # simplistic: ready when idle
                     self.set_buttons()
                 elif typ == "saved":
-                    self.status.set(f"Saved: {payload}")
+                    self._set_status(f"Saved: {payload}")
                 elif typ == "error":
                     messagebox.showerror("Error", payload)
                     self.ready = True
@@ -254,35 +424,30 @@ class App:
                     self.set_buttons()
                 elif typ == "fatal":
                     messagebox.showerror("Fatal", payload)
+                    self._close_evt_pipe()
                     self.root.destroy()
                     return
         except queue.Empty:
             pass
 
-        self.root.after(100, self.poll_events)
-
-    def update_preview(self):
-        frame = self.worker.get_latest_frame()
-        if frame is not None:
+    def update_preview(self, event=None):
+        ppm = self.worker.get_latest_ppm()
+        if ppm is not None:
             try:
-                img = Image.fromarray(frame)
-                self._tk_image = ImageTk.PhotoImage(img)
-                self.video_label.configure(image=self._tk_image)
+                self._tk_src.configure(data=ppm, format="PPM")
+                self._tk_image.tk.call(self._tk_image, "copy", self._tk_src, "-zoom", DISPLAY_ZOOM)
             except Exception:
                 pass
-        self.root.after(int(1000 / FPS), self.update_preview)
 
     def on_record(self):
         self.ready = False
         self.set_buttons()
 
-        out_dir = os.path.expanduser("~/Videos")
-        os.makedirs(out_dir, exist_ok=True)
-        ts = time.strftime("%Y%m%d_%H%M%S")
-        h264_path = os.path.join(out_dir, f"recording_{ts}.h264")
-        mp4_path  = os.path.join(out_dir, f"recording_{ts}.mp4")
+        os.makedirs(OUT_DIR, exist_ok=True)
+        ts = time.strftime(TS_FORMAT)
+        out_path = os.path.join(OUT_DIR, f"recording_{ts}{REC_EXT}")
 
-        self.cmd_q.put(("start", (h264_path, mp4_path)))
+        self.cmd_q.put(("start", out_path))
 
     def on_stop(self):
         self.cmd_q.put(("stop", None))
@@ -297,6 +462,7 @@ class App:
             return
 
         self.cmd_q.put(("shutdown", None))
+        self._close_evt_pipe()
         self.root.destroy()
 
 
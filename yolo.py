@@ -2,6 +2,7 @@
 import os
 import time
 import threading
+import concurrent.futures
 import subprocess
 from pathlib import Path
 
@@ -12,6 +13,11 @@ from gi.repository import Gtk, Gst, GLib
 
 import hailo
 
+try:
+    import av  # in-process libav remux, no ffmpeg fork+exec per file
+except ImportError:
+    av = None
+
 Gst.init(None)
 
 # -----------------------
@@ -78,6 +84,11 @@ POSTPROCESS_SO = '/usr/local/hailo/resources/so/libyolo_hailortpp_postprocess.so
 POSTPROCESS_FN = "filter_letterbox"
 
 
+# Bound once: the buffer probe runs per frame on the streaming thread
+_get_roi = hailo.get_roi_from_buffer
+_HAILO_DETECTION = hailo.HAILO_DETECTION
+
+
 def ts():
     return time.strftime("%Y%m%d_%H%M%S")
 
@@ -88,6 +99,21 @@ def link_chain(*elems):
             raise RuntimeError(f"Failed to Link {a.get_name()} -> {b.get_name()}")
 
 
+def make_h264_enc():
+    # Hardware encoder first (same as yolo2.py's record branch); Pi 5 has none, so x264 on the CPU
+    enc = Gst.ElementFactory.make("v4l2h264enc", None)
+    if enc is not None:
+        enc.set_property("extra-controls", Gst.Structure.new_from_string("controls,repeat_sequence_header=1"))
+        return enc
+    enc = Gst.ElementFactory.make("x264enc", None)
+    if enc is not None:
+        enc.set_property("tune", "zerolatency")
+        enc.set_property("speed-preset", "veryfast")
+        enc.set_property("bitrate", 8000)
+        enc.set_property("key-int-max", 30)
+    return enc
+
+
 class CamRunner:
     """
     One camera pipeline:
@@ -196,15 +222,12 @@ class CamRunner:
         self._frame_count += 1
 
         # Read detections exactly like detection.py / detection_simple.py
-        roi = hailo.get_roi_from_buffer(buf)
-        detections = roi.get_objects_typed(hailo.HAILO_DETECTION)
+        detections = _get_roi(buf).get_objects_typed(_HAILO_DETECTION)
 
-        # Keep printing short (you can expand)
-        lines = []
-        for det in detections:
-            lines.append(f"{det.get_label()} {det.get_confidence():.2f}")
-        if lines:
-            print(f"[CAM{self.idx}] frame={self._frame_count} :: " + ", ".join(lines[:8]))
+        # Keep printing short (you can expand); only the printed ones get formatted
+        if detections:
+            lines = [f"{det.get_label()} {det.get_confidence():.2f}" for det in detections[:8]]
+            print(f"[CAM{self.idx}] frame={self._frame_count} :: " + ", ".join(lines))
 
         return Gst.PadProbeReturn.OK
 
@@ -223,17 +246,7 @@ class CamRunner:
         caps = Gst.ElementFactory.make("capsfilter", None)
         caps.set_property("caps", Gst.Caps.from_string("video/x-raw,format=I420"))
 
-        #enc = Gst.ElementFactory.make("v4l2h264enc", None)
-        enc = Gst.ElementFactory.make("x264enc", None)
-        if enc is None:
-            # fallback (CPU)
-            enc = Gst.ElementFactory.make("avanc_h26", None)
-        if enc is None:
-            enc.set_property("tune", "zerolatency")
-            enc.set_property("speed-preset", "veryfast")
-            enc.set_property("bitrate", 8000)
-            enc.set_property("key-int-max", 30)
-        
+        enc = make_h264_enc()
 
         parse = Gst.ElementFactory.make("h264parse", None)
         if parse:
@@ -305,21 +318,53 @@ class CamRunner:
         return mkv
 
 
+def _remux_av(mkv, mp4):
+    """Stream-copy remux (same as ffmpeg -c copy): packets pass straight from the MKV into the MP4."""
+    with av.open(mkv) as src, av.open(mp4, "w", options={"movflags": "+faststart"}) as dst:
+        add = getattr(dst, "add_stream_from_template", None)  # PyAV >= 14; older uses add_stream(template=)
+        out = {s.index: add(s) if add else dst.add_stream(template=s) for s in src.streams}
+        for packet in src.demux():
+            # Only the demuxer's flush packet is empty; real packets may lack a dts (B-frames)
+            if packet.size == 0:
+                continue
+            packet.stream = out[packet.stream.index]
+            dst.mux(packet)
+
+
+def _remux_one(mkv):
+    mp4 = str(Path(mkv).with_suffix(".mp4"))
+    ok = False
+    if av is not None:
+        try:
+            _remux_av(mkv, mp4)
+            ok = True
+        except Exception as e:
+            print(f"[REMUX] PyAV failed for {mkv} ({e}); falling back to ffmpeg")
+    if not ok:
+        # stream-copy (fast), no re-encode
+        cmd = ["ffmpeg", "-y", "-i", mkv, "-c", "copy", "-movflags", "+faststart", mp4]
+        p = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        if p.returncode != 0:
+            print(f"[REMUX ERROR] ffmpeg failed for {mkv}:\n{p.stderr}")
+            return
+    # Only drop the MKV once an MP4 was actually written
+    try:
+        os.remove(mkv)
+    except OSError:
+        pass
+    print(f"[REMUX] {mp4}")
+
+
 def remux_to_mp4_async(mkv_paths):
+    # The files are independent: remux them side by side instead of one after the other
+    mkv_paths = [mkv for mkv in mkv_paths if mkv is not None]
+
     def worker():
-        for mkv in mkv_paths:
-            if mkv is None:
-                continue
-            mp4 = str(Path(mkv).with_suffix(".mp4"))
-            # stream-copy (fast), no re-encode
-            cmd = ["ffmpeg", "-y", "-i", mkv, "-c", "copy", "-movflags", "+faststart", mp4]
-            subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            try:
-                os.remove(mkv)
-            except OSError:
-                pass
-            print(f"[REMUX] {mp4}")
-    threading.Thread(target=worker, daemon=True).start()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(mkv_paths)) as ex:
+            list(ex.map(_remux_one, mkv_paths))
+
+    if mkv_paths:
+        threading.Thread(target=worker, daemon=True).start()
 
 
 class App(Gtk.Window):
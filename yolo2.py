@@ -1,7 +1,6 @@
 #!/usr/bin/env python3
 import os
 import time
-import subprocess
 import gi
 
 gi.require_version("Gtk", "3.0")
@@ -14,11 +13,12 @@ from gi.repository import Gtk, Gst, GLib
 CAM0_NAME = 'PUT_CAMERA0_NAME_HERE'
 CAM1_NAME = 'PUT_CAMERA1_NAME_HERE'
 
-# Use the SAME HEF + postprocess + draw libs your hailo-rpi5-examples YOLO uses.
+# Use the SAME HEF + postprocess libs your hailo-rpi5-examples YOLO uses.
 HEF_PATH = '/home/pi/hailo-rpi5-examples/resources/PUT_MODEL.hef'
 POSTPROCESS_SO = '/home/pi/hailo-rpi5-examples/resources/libPUT_POSTPROCESS.so'
-DRAW_SO = '/home/pi/hailo-rpi5-examples/resources/libPUT_DRAW.so'
 POSTPROCESS_FUNCTION = 'yolov5'  # must match the postprocess .so expectations
+# Cropper library used by Hailo examples (whole frame -> network input, ROI mapped back on aggregate)
+CROP_SO = "/usr/lib/aarch64-linux-gnu/hailo/tappas/post_processes/cropping_algorithms/libwhole_buffer.so"
 
 # Recording / preview settings
 REC_WIDTH, REC_HEIGHT, REC_FPS = 1920, 1080, 10
@@ -26,21 +26,22 @@ PREV_WIDTH, PREV_HEIGHT, PREV_FPS = 1280, 720, 10
 
 OUT_DIR = os.path.expanduser("~/Videos")
 DIVIDER_GAP_PX = 6  # blank gap between the two previews
+EOS_TIMEOUT = 10 * Gst.SECOND  # bounded, since the wait runs on the GTK thread
 
 # -----------------------------
 
 Gst.init(None)
 
+# Format convert + scale (network input, preview): the V4L2 M2M converter does it off the CPU where the
+# board has one; otherwise fall back to software (multi-threaded) convert + scale
+if Gst.ElementFactory.find("v4l2convert") is not None:
+    PREVIEW_CONVERT = "v4l2convert"
+else:
+    PREVIEW_CONVERT = "videoconvert n-threads=2 ! videoscale n-threads=2"
+
 def ts():
     return time.strftime("%Y%m%d_%H%M%S")
 
-def remux_to_mp4(mkv_path: str) -> str:
-    mp4_path = os.path.splitext(mkv_path)[0] + ".mp4"
-    # Stream copy (fast), no re-encode
-    subprocess.run(["ffmpeg", "-y", "-i", mkv_path, "-c", "copy", mp4_path],
-                   check=False, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-    return mp4_path
-
 class App(Gtk.Window):
     def __init__(self):
         super().__init__(title="Dual Camera (Hailo YOLO)")
@@ -51,8 +52,8 @@ class App(Gtk.Window):
         self.pipeline = None
         self.sink_widget = None
         self.recording = False
-        self.last_mkv0 = None
-        self.last_mkv1 = None
+        self.last_mp40 = None
+        self.last_mp41 = None
 
         root = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=8)
         root.set_border_width(8)
@@ -78,35 +79,17 @@ class App(Gtk.Window):
         self.start_preview_pipeline()
 
     def build_pipeline(self, do_record: bool):
-        # Output file paths (Matroska is robust; then we remux to MP4 on Stop)
-        mkv0 = os.path.join(OUT_DIR, f"cam0_{ts()}.mkv") if do_record else None
-        mkv1 = os.path.join(OUT_DIR, f"cam1_{ts()}.mkv") if do_record else None
-
-        # Two branches:
-        #  - record branch: full res -> HW encoder -> mkv
-        #  - preview/detect branch: scaled -> hailonet -> postprocess -> draw -> compositor -> gtksink
-        #
-        # Hailo detection chain is per Hailo TAPPAS detection pipeline pattern: hailonet + hailofilter(post) + hailofilter(draw). 
+        # Output file paths (muxed straight to MP4; Stop sends EOS so mp4mux can write the moov)
+        mp40 = os.path.join(OUT_DIR, f"cam0_{ts()}.mp4") if do_record else None
+        mp41 = os.path.join(OUT_DIR, f"cam1_{ts()}.mp4") if do_record else None
+
+        # Per camera, inference runs once on the full-res frame and feeds both outputs:
+        #   cropper -> (bypass: full res) + (scaled -> hailonet -> postprocess) -> aggregator
+        #   -> hailooverlay draws the boxes at full res -> tee
+        #        tee -> scaled -> compositor -> gtksink (preview)
+        #        tee -> HW encoder -> mp4 (record, boxes included)
         #
         # Camera selection via libcamerasrc camera-name="..." 
-
-        # Note: Using v4l2h264enc is typically the Pi hardware encoder; matroskamux example exists in libcamera+gstreamer docs. 
-        rec0 = ""
-        rec1 = ""
-        if do_record:
-            rec0 = f"""
-                cam0tee. ! queue !
-                v4l2h264enc extra-controls="controls,repeat_sequence_header=1" !
-                h264parse ! matroskamux !
-                filesink location="{mkv0}" sync=false
-            """
-            rec1 = f"""
-                cam1tee. ! queue !
-                v4l2h264enc extra-controls="controls,repeat_sequence_header=1" !
-                h264parse ! matroskamux !
-                filesink location="{mkv1}" sync=false
-            """
-
         pipeline_str = f"""
             compositor name=comp background=black
                 sink_0::xpos=0 sink_0::ypos=0
@@ -114,43 +97,55 @@ class App(Gtk.Window):
             ! videoconvert !
               fpsdisplaysink video-sink=gtksink name=display sync=false text-overlay=false
 
-            libcamerasrc camera-name="{CAM0_NAME}" !
-              video/x-raw,format=NV12,width={REC_WIDTH},height={REC_HEIGHT},framerate={REC_FPS}/1 !
-              tee name=cam0tee
-            cam0tee. ! queue ! videoconvert ! videoscale !
-              video/x-raw,format=YUY2,width={PREV_WIDTH},height={PREV_HEIGHT},framerate={PREV_FPS}/1 !
-              queue leaky=downstream max-size-buffers=5 max-size-bytes=0 max-size-time=0 !
-              hailonet hef-path="{HEF_PATH}" qos=false batch-size=1 !
-              queue !
-              hailofilter function-name="{POSTPROCESS_FUNCTION}" so-path="{POSTPROCESS_SO}" qos=false debug=false !
-              queue !
-              hailofilter so-path="{DRAW_SO}" qos=false debug=false !
-              queue !
-              videoconvert ! comp.sink_0
-            {rec0}
+            {self.camera_branch(0, CAM0_NAME, mp40)}
+            {self.camera_branch(1, CAM1_NAME, mp41)}
+        """
+
+        return pipeline_str, mp40, mp41
+
+    def camera_branch(self, idx: int, cam_name: str, mp4_path):
+        # Note: Using v4l2h264enc is typically the Pi hardware encoder; mp4mux takes its parsed H.264 directly.
+        rec = ""
+        if mp4_path:
+            rec = f"""
+            cam{idx}tee. ! queue !
+              v4l2h264enc extra-controls="controls,repeat_sequence_header=1" !
+              h264parse ! mp4mux faststart=true !
+              filesink location="{mp4_path}" sync=false
+            """
 
-            libcamerasrc camera-name="{CAM1_NAME}" !
+        # No leaky queues between cropper and aggregator: it pairs every bypass frame with its inference result
+        return f"""
+            libcamerasrc camera-name="{cam_name}" !
               video/x-raw,format=NV12,width={REC_WIDTH},height={REC_HEIGHT},framerate={REC_FPS}/1 !
-              tee name=cam1tee
-            cam1tee. ! queue ! videoconvert ! videoscale !
-              video/x-raw,format=YUY2,width={PREV_WIDTH},height={PREV_HEIGHT},framerate={PREV_FPS}/1 !
-              queue leaky=downstream max-size-buffers=5 max-size-bytes=0 max-size-time=0 !
-              hailonet hef-path="{HEF_PATH}" qos=false batch-size=1 !
+              queue max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
+              hailocropper name=cam{idx}crop so-path="{CROP_SO}" function-name=create_crops
+                use-letterbox=true resize-method=inter-area internal-offset=true
+              hailoaggregator name=cam{idx}agg
+
+            cam{idx}crop. ! queue max-size-buffers=20 max-size-bytes=0 max-size-time=0 ! cam{idx}agg.sink_0
+
+            cam{idx}crop. ! queue max-size-buffers=3 max-size-bytes=0 max-size-time=0 ! {PREVIEW_CONVERT} !
+              video/x-raw,format=YUY2 !
+              queue max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
+              hailonet hef-path="{HEF_PATH}" vdevice-group-id=1 qos=false batch-size=1 !
               queue !
               hailofilter function-name="{POSTPROCESS_FUNCTION}" so-path="{POSTPROCESS_SO}" qos=false debug=false !
-              queue !
-              hailofilter so-path="{DRAW_SO}" qos=false debug=false !
-              queue !
-              videoconvert ! comp.sink_1
-            {rec1}
-        """
+              queue ! cam{idx}agg.sink_1
+
+            cam{idx}agg. ! queue ! hailooverlay qos=false ! tee name=cam{idx}tee
 
-        return pipeline_str, mkv0, mkv1
+            cam{idx}tee. ! queue leaky=downstream max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
+              videorate drop-only=true ! video/x-raw,framerate={PREV_FPS}/1 !
+              {PREVIEW_CONVERT} !
+              video/x-raw,width={PREV_WIDTH},height={PREV_HEIGHT} ! comp.sink_{idx}
+            {rec}
+        """
 
     def start_pipeline(self, do_record: bool):
         self.stop_pipeline()
 
-        pipeline_str, mkv0, mkv1 = self.build_pipeline(do_record)
+        pipeline_str, mp40, mp41 = self.build_pipeline(do_record)
         self.pipeline = Gst.parse_launch(pipeline_str)
 
         # Embed gtksink widget into our single window
@@ -164,9 +159,9 @@ class App(Gtk.Window):
         self.video_box.pack_start(widget, True, True, 0)
         self.video_box.show_all()
 
-        # Keep filenames for remux
-        self.last_mkv0 = mkv0
-        self.last_mkv1 = mkv1
+        # Keep filenames for the "Saved" report
+        self.last_mp40 = mp40
+        self.last_mp41 = mp41
 
         # Start playing
         self.pipeline.set_state(Gst.State.PLAYING)
@@ -184,8 +179,16 @@ class App(Gtk.Window):
         self.btn_stop.set_sensitive(True)
         self.start_pipeline(do_record=True)
 
-    def stop_pipeline(self):
+    def stop_pipeline(self, eos: bool = False):
         if self.pipeline is not None:
+            if eos:
+                # mp4mux only finalizes (moov, faststart) on EOS; NULL alone leaves an unplayable file
+                self.pipeline.send_event(Gst.Event.new_eos())
+                msg = self.pipeline.get_bus().timed_pop_filtered(
+                    EOS_TIMEOUT, Gst.MessageType.EOS | Gst.MessageType.ERROR)
+                if msg is None or msg.type != Gst.MessageType.EOS:
+                    # A stalled source/hailonet never delivers EOS; don't hang the UI waiting for it
+                    print("WARNING: EOS not reached; the MP4s may not be finalized")
             self.pipeline.set_state(Gst.State.NULL)
             self.pipeline = None
 
@@ -193,22 +196,19 @@ class App(Gtk.Window):
         self.start_record_pipeline()
 
     def on_stop(self, _btn):
-        # Stop recording pipeline (finalizes MKV)
-        self.stop_pipeline()
+        # Stop recording pipeline (EOS finalizes both MP4s)
+        self.stop_pipeline(eos=True)
 
-        # Remux to MP4 (fast, no re-encode)
-        if self.last_mkv0 and os.path.exists(self.last_mkv0):
-            mp4 = remux_to_mp4(self.last_mkv0)
-            print(f"Saved: {mp4}")
-        if self.last_mkv1 and os.path.exists(self.last_mkv1):
-            mp4 = remux_to_mp4(self.last_mkv1)
-            print(f"Saved: {mp4}")
+        for mp4 in (self.last_mp40, self.last_mp41):
+            if mp4 and os.path.exists(mp4):
+                print(f"Saved: {mp4}")
 
         # Back to preview-only
         self.start_preview_pipeline()
 
     def on_destroy(self, *_):
-        self.stop_pipeline()
+        # Closing mid-recording still finalizes the MP4s
+        self.stop_pipeline(eos=self.recording)
         Gtk.main_quit()
 
 if __name__ == "__main__":
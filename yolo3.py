@@ -1,8 +1,8 @@
 #!/usr/bin/env python3
 import os
+import sys
 import time
 import threading
-import subprocess
 from pathlib import Path
 
 import gi
@@ -25,8 +25,13 @@ CAM1_NAME = "/base/axi/pcie@1000120000/rp1/i2c@80000/imx708@1a"
 PREVIEW_W, PREVIEW_H = 1280, 720
 PREVIEW_FPS = 10
 
+# Print detections from an appsink branch drained by a Python thread per camera. hailooverlay already
+# draws them in C; either way no Python (and no GIL) runs on the cameras' streaming threads.
+LOG_DETECTIONS = True
+LOG_INTERVAL = 1.0  # seconds between detection log lines (per camera)
+
 OUT_DIR = Path.home() / "Videos"
-OUT_DIR.mkdir(parents=True, exist_ok=True)
+REC_WRITE_BUFFER = 4 * 1024 * 1024  # filesink buffer: a few large sequential writes per second, not many 4 KiB ones
 
 # Cropper library used by Hailo examples
 CROP_SO = "/usr/lib/aarch64-linux-gnu/hailo/tappas/post_processes/cropping_algorithms/libwhole_buffer.so"
@@ -70,20 +75,80 @@ def _find_hailo_resources():
 
 HEF_PATH, POSTPROCESS_SO = _find_hailo_resources()
 
+# hailonet batch-size per HEF: multi-context models only keep the NPU busy with larger batches.
+# Both cameras feed the one hailonet, so a batch fills at 2 * PREVIEW_FPS (batch / (2 * PREVIEW_FPS) s of lag).
+HEF_BATCH = {"yolov8s_h8l.hef": 8, "yolov8m_h8l.hef": 8, "yolov8n_h8l.hef": 4}
+HAILONET_BATCH = HEF_BATCH.get(Path(HEF_PATH).name, 2)
+
 # Postprocess function name used by the examples pipeline
 POSTPROCESS_FN = "filter_letterbox"
 
 
+def make_h264_encoder():
+    """
+    Best available H.264 encoder, hardware first.
+    Returns (name, encoder, raw caps it wants, encoded caps to pin or None); name is None if none found.
+    """
+    enc = Gst.ElementFactory.make("v4l2h264enc", None)
+    # The plugin is installed on boards without the M2M block (Pi 5): only use it if its device exists
+    if enc is not None and os.path.exists(enc.get_property("device")):
+        enc.set_property("extra-controls", Gst.Structure.new_from_string("controls,repeat_sequence_header=1"))
+        return "v4l2h264enc", enc, "video/x-raw,format=NV12", "video/x-h264,profile=main,level=(string)4"
+    enc = Gst.ElementFactory.make("omxh264enc", None)
+    if enc is not None:
+        return "omxh264enc", enc, "video/x-raw,format=I420", None
+    enc = Gst.ElementFactory.make("x264enc", None)
+    if enc is not None:
+        enc.set_property("tune", "zerolatency")
+        enc.set_property("speed-preset", "ultrafast")
+        enc.set_property("bitrate", 8000)  # kbps
+        enc.set_property("key-int-max", PREVIEW_FPS)  # the camera runs at PREVIEW_FPS: one keyframe per 1 s fragment
+        return "x264enc", enc, "video/x-raw,format=I420", None
+    enc = Gst.ElementFactory.make("avenc_h264", None)
+    if enc is not None:
+        return "avenc_h264", enc, "video/x-raw,format=I420", None
+    return None, None, None, None
+
+
 def ts():
     return time.strftime("%Y%m%d_%H%M%S")
 
 
+def shared_inference(n_cams: int) -> str:
+    """
+    One hailonet (one HEF load, one scheduler context) for every camera:
+      cam crops -> hailoroundrobin -> hailonet -> hailofilter -> hailostreamrouter -> back to each cam's aggregator
+    The router sends each result to the camera whose roundrobin sink pad it came in on.
+    """
+    routes = " ".join(f'src_{i}::input-streams="<sink_{i}>"' for i in range(n_cams))
+    return f"""
+        hailoroundrobin name=inference_rr mode=0 !
+            queue name=inference_hailonet_q leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
+            hailonet name=inference_hailonet
+                hef-path="{HEF_PATH}"
+                batch-size={HAILONET_BATCH}
+                vdevice-group-id=1
+                scheduling-algorithm=1
+                nms-score-threshold=0.3
+                nms-iou-threshold=0.45
+                output-format-type=HAILO_FORMAT_TYPE_FLOAT32
+                force-writable=true !
+            queue name=inference_hailofilter_q leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
+            hailofilter name=inference_hailofilter
+                so-path="{POSTPROCESS_SO}"
+                function-name={POSTPROCESS_FN}
+                qos=false !
+            hailostreamrouter name=inference_router {routes}
+    """
+
+
 class CamRunner:
     """
-    One camera pipeline:
-      libcamerasrc -> (Hailo detection pipeline like examples) -> hailooverlay -> tee
-         tee -> gtksink (preview)
-         tee -> (optional) record bin (mkv)
+    One camera's branch of the shared pipeline:
+      libcamerasrc -> (Hailo detection pipeline like examples, hailonet shared via shared_inference) -> hailooverlay -> tee
+         tee -> videoconvert -> gtksink (preview)
+         tee -> appsink (detections log, drained on its own thread; LOG_DETECTIONS)
+         tee -> (optional) record bin (fragmented mp4)
     """
     def __init__(self, cam_name: str, idx: int):
         self.cam_name = cam_name
@@ -91,26 +156,36 @@ class CamRunner:
 
         self.pipeline = None
         self.gtksink = None
-        self.identity = None
+        self.dets_sink = None
 
         self._tee = None
         self._tee_pad = None
         self._rec_bin = None
 
         self._recording = False
-        self._last_mkv = None
+        self._last_mp4 = None
 
-        self._frame_count = 0
+        # hailo module lookups bound once for the detection drain loop
+        self._get_roi = hailo.get_roi_from_buffer
+        self._det_type = hailo.HAILO_DETECTION
+        self._log_prefix = "[CAM%d] pts=" % idx
+        self._dets_thread = None
 
-    def build(self):
-        # This mirrors the structure printed by hailo-rpi5-examples (cropper+aggregator+hailonet+hailofilter+overlay+identity)
+    def fragment(self) -> str:
+        # This mirrors the structure printed by hailo-rpi5-examples (cropper+aggregator+hailonet+hailofilter+overlay)
         # See the example-generated pipeline string for these exact elements/params. 
-        pipe = f"""
+        # The cropper takes the camera's NV12 as-is; only the (network-sized) inference crop is converted to RGB
+        dets = ""
+        if LOG_DETECTIONS:
+            # Latest frame only (ROI metadata rides on the buffer); never blocks the tee
+            dets = f"""
+            tee_{self.idx}. !
+                queue name=dets_q_{self.idx} leaky=downstream max-size-buffers=1 max-size-bytes=0 max-size-time=0 !
+                appsink name=dets_{self.idx} emit-signals=false sync=false max-buffers=1 drop=true
+            """
+        return f"""
             libcamerasrc camera-name="{self.cam_name}" name=source_{self.idx} !
-            video/x-raw,format=NV12,width={PREVIEW_W},height={PREVIEW_H},framerate={PREVIEW_FPS}/1 !
-            queue name=source_q_{self.idx} leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
-            videoconvert n-threads=2 qos=false !
-            video/x-raw, pixel-aspect-ratio=1/1, format=RGB, width={PREVIEW_W}, height={PREVIEW_H} !
+            video/x-raw,format=NV12,width={PREVIEW_W},height={PREVIEW_H},framerate={PREVIEW_FPS}/1,pixel-aspect-ratio=1/1 !
             queue name=inference_wrapper_input_q_{self.idx} leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
             hailocropper name=inference_wrapper_crop_{self.idx}
                 so-path="{CROP_SO}" function-name=create_crops
@@ -123,113 +198,111 @@ class CamRunner:
 
             inference_wrapper_crop_{self.idx}. !
                 queue name=inference_scale_q_{self.idx} leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
-                videoscale n-threads=2 qos=false !
+                videoscale n-threads=0 qos=false !
                 queue name=inference_convert_q_{self.idx} leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
-                videoconvert n-threads=2 qos=false !
-                queue name=inference_hailonet_q_{self.idx} leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
-                hailonet name=inference_hailonet_{self.idx}
-                    hef-path="{HEF_PATH}"
-                    batch-size=2
-                    vdevice-group-id=1
-                    nms-score-threshold=0.3
-                    nms-iou-threshold=0.45
-                    output-format-type=HAILO_FORMAT_TYPE_FLOAT32
-                    force-writable=true !
-                queue name=inference_hailofilter_q_{self.idx} leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
-                hailofilter name=inference_hailofilter_{self.idx}
-                    so-path="{POSTPROCESS_SO}"
-                    function-name={POSTPROCESS_FN}
-                    qos=false !
+                videoconvert n-threads=0 qos=false !
+                inference_rr.sink_{self.idx}
+
+            inference_router.src_{self.idx} !
                 queue name=inference_output_q_{self.idx} leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
                 inference_wrapper_agg_{self.idx}.sink_1
 
             inference_wrapper_agg_{self.idx}. !
-                queue name=postagg_q_{self.idx} leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
-                identity name=identity_callback_{self.idx} !
                 queue name=overlay_q_{self.idx} leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
                 hailooverlay name=hailo_overlay_{self.idx} !
-                queue name=display_convert_q_{self.idx} leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
-                videoconvert n-threads=2 qos=false !
                 tee name=tee_{self.idx}
 
             tee_{self.idx}. !
-                queue name=preview_q_{self.idx} leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
+                queue name=preview_q_{self.idx} leaky=downstream max-size-buffers=1 max-size-bytes=0 max-size-time=0 !
+                videoconvert n-threads=0 qos=false !
                 gtksink name=gtksink_{self.idx} sync=true
+            {dets}
         """
 
-        self.pipeline = Gst.parse_launch(pipe)
+    def attach(self, pipeline: Gst.Pipeline):
+        self.pipeline = pipeline
         self.gtksink = self.pipeline.get_by_name(f"gtksink_{self.idx}")
-        self.identity = self.pipeline.get_by_name(f"identity_callback_{self.idx}")
         self._tee = self.pipeline.get_by_name(f"tee_{self.idx}")
 
-        if not self.gtksink or not self.identity or not self._tee:
-            raise RuntimeError("Failed to build pipeline elements (gtksink/identity/tee missing).")
+        if not self.gtksink or not self._tee:
+            raise RuntimeError("Failed to build pipeline elements (gtksink/tee missing).")
 
-        # Attach probe like the examples: read detections from buffer ROI
-        srcpad = self.identity.get_static_pad("src")
-        srcpad.add_probe(Gst.PadProbeType.BUFFER, self._on_buffer)
+        if LOG_DETECTIONS:
+            self.dets_sink = self.pipeline.get_by_name(f"dets_{self.idx}")
+            if not self.dets_sink:
+                raise RuntimeError("Failed to build pipeline elements (detections appsink missing).")
+            self._dets_thread = threading.Thread(target=self._drain_detections, daemon=True)
+            self._dets_thread.start()
 
     def widget(self) -> Gtk.Widget:
         return self.gtksink.get_property("widget")
 
-    def start(self):
-        self.pipeline.set_state(Gst.State.PLAYING)
-
-    def stop(self):
-        self.pipeline.set_state(Gst.State.NULL)
-
-    def _on_buffer(self, pad, info):
-        buf = info.get_buffer()
-        if buf is None:
-            return Gst.PadProbeReturn.OK
-
-        self._frame_count += 1
+    def _drain_detections(self):
+        # appsink drop=true keeps only the newest sample, so sleeping LOG_INTERVAL between pulls is the rate limit
+        timeout = int(LOG_INTERVAL * Gst.SECOND)
+        while True:
+            sample = self.dets_sink.try_pull_sample(timeout)
+            if sample is not None:
+                buf = sample.get_buffer()
 
-        # Read detections exactly like detection.py / detection_simple.py
-        roi = hailo.get_roi_from_buffer(buf)
-        detections = roi.get_objects_typed(hailo.HAILO_DETECTION)
+                # Read detections exactly like detection.py / detection_simple.py
+                roi = self._get_roi(buf)
+                detections = roi.get_objects_typed(self._det_type)
 
-        # Keep printing short (you can expand)
-        lines = []
-        for det in detections:
-            lines.append(f"{det.get_label()} {det.get_confidence():.2f}")
-        if lines:
-            print(f"[CAM{self.idx}] frame={self._frame_count} :: " + ", ".join(lines[:8]))
-
-        return Gst.PadProbeReturn.OK
+                # Keep printing short (you can expand)
+                if detections:
+                    lines = ", ".join(["%s %.2f" % (det.get_label(), det.get_confidence()) for det in detections[:8]])
+                    sys.stdout.write("%s%.2fs :: %s\n" % (self._log_prefix, buf.pts / Gst.SECOND, lines))
+            time.sleep(LOG_INTERVAL)
 
     def start_recording(self):
         if self._recording:
             return
 
-        mkv_path = OUT_DIR / f"cam{self.idx}_{ts()}.mkv"
-        self._last_mkv = str(mkv_path)
+        OUT_DIR.mkdir(parents=True, exist_ok=True)
+        mp4_path = OUT_DIR / f"cam{self.idx}_{ts()}.mp4"
+        self._last_mp4 = str(mp4_path)
 
         rec_bin = Gst.Bin.new(f"record_bin_{self.idx}")
 
         q = Gst.ElementFactory.make("queue", None)
         conv = Gst.ElementFactory.make("videoconvert", None)
-
-        enc = Gst.ElementFactory.make("v4l2h264enc", None)
-        if enc is None:
-            # fallback (CPU)
-            enc = Gst.ElementFactory.make("x264enc", None)
-            enc.set_property("tune", "zerolatency")
+        if conv:
+            conv.set_property("n-threads", 0)
+            conv.set_property("qos", False)
+
+        enc_name, enc, raw_caps, enc_caps = make_h264_encoder()
+        caps = Gst.ElementFactory.make("capsfilter", None)
+        if caps and raw_caps:
+            caps.set_property("caps", Gst.Caps.from_string(raw_caps))
+        chain = [q, conv, caps, enc]
+        if enc_caps:
+            enc_filter = Gst.ElementFactory.make("capsfilter", None)
+            if enc_filter:
+                enc_filter.set_property("caps", Gst.Caps.from_string(enc_caps))
+            chain.append(enc_filter)
 
         parse = Gst.ElementFactory.make("h264parse", None)
         if parse:
             parse.set_property("config-interval", 1)
 
-        mux = Gst.ElementFactory.make("matroskamux", None)
+        # Fragmented MP4 straight from the recorder: playable as written, no MKV -> MP4 remux on Stop
+        mux = Gst.ElementFactory.make("qtmux", None)
+        if mux:
+            mux.set_property("fragment-duration", 1000)  # ms
+            mux.set_property("streamable", True)
         sink = Gst.ElementFactory.make("filesink", None)
-        sink.set_property("location", self._last_mkv)
+        sink.set_property("location", self._last_mp4)
+        Gst.util_set_object_arg(sink, "buffer-mode", "full")
+        sink.set_property("buffer-size", REC_WRITE_BUFFER)
 
-        for e in (q, conv, enc, parse, mux, sink):
+        chain += [parse, mux, sink]
+        for e in chain:
             if e is None:
                 raise RuntimeError("Failed to create a recording element (encoder/mux/sink missing).")
             rec_bin.add(e)
 
-        Gst.Element.link_many(q, conv, enc, parse, mux, sink)
+        Gst.Element.link_many(*chain)
 
         # Ghost sink pad so we can link tee -> record_bin
         sinkpad = q.get_static_pad("sink")
@@ -251,7 +324,7 @@ class CamRunner:
         self._tee_pad = tee_pad
         self._rec_bin = rec_bin
         self._recording = True
-        print(f"[CAM{self.idx}] recording -> {self._last_mkv}")
+        print(f"[CAM{self.idx}] recording -> {self._last_mp4}")
 
     def stop_recording(self):
         if not self._recording:
@@ -274,32 +347,15 @@ class CamRunner:
         except Exception:
             pass
 
-        mkv = self._last_mkv
+        mp4 = self._last_mp4
 
         self._tee_pad = None
         self._rec_bin = None
         self._recording = False
-        self._last_mkv = None
-
-        print(f"[CAM{self.idx}] stopped (mkv) -> {mkv}")
-        return mkv
+        self._last_mp4 = None
 
-
-def remux_to_mp4_async(mkv_paths):
-    def worker():
-        for mkv in mkv_paths:
-            if mkv is None:
-                continue
-            mp4 = str(Path(mkv).with_suffix(".mp4"))
-            # stream-copy (fast), no re-encode
-            cmd = ["ffmpeg", "-y", "-i", mkv, "-c", "copy", "-movflags", "+faststart", mp4]
-            subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            try:
-                os.remove(mkv)
-            except OSError:
-                pass
-            print(f"[REMUX] {mp4}")
-    threading.Thread(target=worker, daemon=True).start()
+        print(f"[CAM{self.idx}] stopped (mp4) -> {mp4}")
+        return mp4
 
 
 class App(Gtk.Window):
@@ -312,8 +368,11 @@ class App(Gtk.Window):
         self.cam0 = CamRunner(CAM0_NAME, 0)
         self.cam1 = CamRunner(CAM1_NAME, 1)
 
-        self.cam0.build()
-        self.cam1.build()
+        # Both cameras share one pipeline so they can share one hailonet
+        self.pipeline = Gst.parse_launch(
+            self.cam0.fragment() + self.cam1.fragment() + shared_inference(2))
+        self.cam0.attach(self.pipeline)
+        self.cam1.attach(self.pipeline)
 
         # UI
         root = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=8)
@@ -343,9 +402,8 @@ class App(Gtk.Window):
         self.status = Gtk.Label(label=f"HEF: {Path(HEF_PATH).name}")
         btn_row.pack_start(self.status, True, True, 0)
 
-        # Start pipelines
-        self.cam0.start()
-        self.cam1.start()
+        # Start pipeline
+        self.pipeline.set_state(Gst.State.PLAYING)
 
     def on_record(self, _btn):
         self.record_btn.set_sensitive(False)
@@ -359,11 +417,10 @@ class App(Gtk.Window):
     def on_stop(self, _btn):
         self.stop_btn.set_sensitive(False)
         self.record_btn.set_sensitive(True)
-        self.status.set_text("Stopping... (remuxing to mp4)")
+        self.status.set_text("Stopping...")
 
-        mkv0 = self.cam0.stop_recording()
-        mkv1 = self.cam1.stop_recording()
-        remux_to_mp4_async([mkv0, mkv1])
+        self.cam0.stop_recording()
+        self.cam1.stop_recording()
 
         self.status.set_text("Preview running. Videos saved in ~/Videos (mp4).")
 
@@ -1,20 +1,21 @@
 #!/usr/bin/env python3
 import os
 import time
-import threading
-import subprocess
+import ctypes
+import operator
+import contextlib
 from pathlib import Path
 
+import numpy as np
+
 import gi
 gi.require_version("Gtk", "3.0")
 gi.require_version("Gst", "1.0")
-from gi.repository import Gtk, Gst
+gi.require_version("GstVideo", "1.0")
+from gi.repository import Gtk, Gst, GstVideo
 
 import hailo
 
-# cairooverlay uses pycairo
-import cairo
-
 Gst.init(None)
 
 # -----------------------
@@ -27,7 +28,7 @@ PREVIEW_W, PREVIEW_H = 1280, 720
 PREVIEW_FPS = 10
 
 OUT_DIR = Path.home() / "Videos"
-OUT_DIR.mkdir(parents=True, exist_ok=True)
+REC_WRITE_BUFFER = 4 * 1024 * 1024  # filesink buffer: a few large sequential writes per second, not many 4 KiB ones
 
 # Cropper library used by Hailo examples
 CROP_SO = "/usr/lib/aarch64-linux-gnu/hailo/tappas/post_processes/cropping_algorithms/libwhole_buffer.so"
@@ -36,6 +37,40 @@ CROP_SO = "/usr/lib/aarch64-linux-gnu/hailo/tappas/post_processes/cropping_algor
 POSTPROCESS_SO = "/usr/local/hailo/resources/so/libyolo_hailortpp_postprocess.so"
 POSTPROCESS_FN = "filter_letterbox"
 
+MAX_DETS = 100  # boxes kept per frame (extra detections are not drawn)
+# normalized (x0,y0,x1,y1) -> clamped preview pixels
+_BOX_SCALE = np.array([PREVIEW_W, PREVIEW_H] * 2, np.float32)
+_BOX_MAX = np.array([PREVIEW_W - 1, PREVIEW_H - 1] * 2, np.float32)
+# Box colour stamped into the NV12 frame: pure green in BT.601 limited range, 2 px lines
+_GREEN_Y = 145
+_GREEN_UV = np.array([54, 34], np.uint8)
+
+
+def make_h264_encoder():
+    """
+    Best available H.264 encoder, hardware first.
+    Returns (name, encoder, raw caps it wants, encoded caps to pin or None); name is None if none found.
+    """
+    enc = Gst.ElementFactory.make("v4l2h264enc", None)
+    # The plugin is installed on boards without the M2M block (Pi 5): only use it if its device exists
+    if enc is not None and os.path.exists(enc.get_property("device")):
+        enc.set_property("extra-controls", Gst.Structure.new_from_string("controls,repeat_sequence_header=1"))
+        return "v4l2h264enc", enc, "video/x-raw,format=NV12", "video/x-h264,profile=main,level=(string)4"
+    enc = Gst.ElementFactory.make("omxh264enc", None)
+    if enc is not None:
+        return "omxh264enc", enc, "video/x-raw,format=I420", None
+    enc = Gst.ElementFactory.make("x264enc", None)
+    if enc is not None:
+        enc.set_property("tune", "zerolatency")
+        enc.set_property("speed-preset", "ultrafast")
+        enc.set_property("bitrate", 8000)  # kbps
+        enc.set_property("key-int-max", PREVIEW_FPS)  # the camera runs at PREVIEW_FPS: one keyframe per 1 s fragment
+        return "x264enc", enc, "video/x-raw,format=I420", None
+    enc = Gst.ElementFactory.make("avenc_h264", None)
+    if enc is not None:
+        return "avenc_h264", enc, "video/x-raw,format=I420", None
+    return None, None, None, None
+
 
 def ts():
     return time.strftime("%Y%m%d_%H%M%S")
@@ -94,124 +129,203 @@ def pick_detection_hef() -> str:
 
 HEF_PATH = pick_detection_hef()
 
+# hailonet batch-size per HEF: multi-context models only keep the NPU busy with larger batches.
+# Each batch waits for that many frames per camera (batch / PREVIEW_FPS seconds of extra preview lag).
+HEF_BATCH = {"yolov8s_h8l.hef": 8, "yolov8m_h8l.hef": 8, "yolov8n_h8l.hef": 4}
+HAILONET_BATCH = HEF_BATCH.get(Path(HEF_PATH).name, 2)
+
+
+# PyGObject's Gst.Buffer.map() hands Python a copy of the data; map the GstMemory directly instead
+_libgst = ctypes.CDLL("libgstreamer-1.0.so.0")
+
 
-def _bbox_get(bbox, name: str):
+class _GstMapInfo(ctypes.Structure):
+    _fields_ = [
+        ("memory", ctypes.c_void_p),
+        ("flags", ctypes.c_int),
+        ("data", ctypes.POINTER(ctypes.c_ubyte)),
+        ("size", ctypes.c_size_t),
+        ("maxsize", ctypes.c_size_t),
+        ("user_data", ctypes.c_void_p * 4),
+        ("_gst_reserved", ctypes.c_void_p * 4),
+    ]
+
+
+_libgst.gst_buffer_find_memory.argtypes = [
+    ctypes.c_void_p, ctypes.c_size_t, ctypes.c_size_t,
+    ctypes.POINTER(ctypes.c_uint), ctypes.POINTER(ctypes.c_uint), ctypes.POINTER(ctypes.c_size_t),
+]
+_libgst.gst_buffer_find_memory.restype = ctypes.c_bool
+_libgst.gst_buffer_peek_memory.argtypes = [ctypes.c_void_p, ctypes.c_uint]
+_libgst.gst_buffer_peek_memory.restype = ctypes.c_void_p
+_libgst.gst_memory_map.argtypes = [ctypes.c_void_p, ctypes.POINTER(_GstMapInfo), ctypes.c_int]
+_libgst.gst_memory_map.restype = ctypes.c_bool
+_libgst.gst_memory_unmap.argtypes = [ctypes.c_void_p, ctypes.POINTER(_GstMapInfo)]
+_libgst.gst_memory_unmap.restype = None
+
+
+@contextlib.contextmanager
+def map_region(buf: Gst.Buffer, offset: int, size: int, flags=Gst.MapFlags.READ):
     """
-    Supports bbox.xmin() or bbox.xmin attribute style.
+    Zero-copy uint8 view of bytes [offset, offset + size) of a Gst.Buffer (None if they can't be mapped).
+    Maps only the GstMemory holding them, so WRITE works even though PyGObject's extra ref makes the
+    buffer itself look non-writable.
+    """
+    ptr = hash(buf)  # PyGObject: hash() of a boxed Gst.Buffer is its C pointer
+    idx, length, skip = ctypes.c_uint(), ctypes.c_uint(), ctypes.c_size_t()
+    if not _libgst.gst_buffer_find_memory(ptr, offset, size, ctypes.byref(idx), ctypes.byref(length), ctypes.byref(skip)) \
+            or length.value != 1:
+        yield None
+        return
+    mem = _libgst.gst_buffer_peek_memory(ptr, idx.value)
+    info = _GstMapInfo()
+    if not _libgst.gst_memory_map(mem, ctypes.byref(info), int(flags)):
+        yield None
+        return
+    try:
+        yield np.ctypeslib.as_array(info.data, shape=(info.size,))[skip.value:skip.value + size]
+    finally:
+        _libgst.gst_memory_unmap(mem, ctypes.byref(info))
+
+
+def draw_boxes_nv12(buf: Gst.Buffer, vinfo, boxes):
+    """Stamp 2 px green rectangles (x0, y0, x1, y1 rows of even pixel coords) straight into an NV12 frame."""
+    w, h = vinfo.width, vinfo.height
+    meta = GstVideo.buffer_get_video_meta(buf)  # real plane layout (libcamera may pad strides)
+    offset, stride = (meta.offset, meta.stride) if meta is not None else (vinfo.offset, vinfo.stride)
+    write = Gst.MapFlags.READ | Gst.MapFlags.WRITE
+    with map_region(buf, offset[0], stride[0] * h, write) as ybytes, \
+            map_region(buf, offset[1], stride[1] * (h // 2), write) as uvbytes:
+        if ybytes is None or uvbytes is None:
+            return False
+        y = ybytes.reshape(h, stride[0])[:, :w]
+        uv = uvbytes.reshape(h // 2, stride[1])[:, :w].reshape(h // 2, w // 2, 2)
+        for x0, y0, x1, y1 in boxes:
+            y[y0:y0 + 2, x0:x1 + 2] = _GREEN_Y
+            y[y1:y1 + 2, x0:x1 + 2] = _GREEN_Y
+            y[y0:y1 + 2, x0:x0 + 2] = _GREEN_Y
+            y[y0:y1 + 2, x1:x1 + 2] = _GREEN_Y
+            cx0, cy0, cx1, cy1 = x0 // 2, y0 // 2, x1 // 2, y1 // 2
+            uv[cy0, cx0:cx1 + 1] = _GREEN_UV
+            uv[cy1, cx0:cx1 + 1] = _GREEN_UV
+            uv[cy0:cy1 + 1, cx0] = _GREEN_UV
+            uv[cy0:cy1 + 1, cx1] = _GREEN_UV
+    return True
+
+
+def _bbox_accessor(bbox, name: str):
+    """
+    Getter for bbox.xmin() or bbox.xmin attribute style (the API never changes, so resolve once).
     """
-    if hasattr(bbox, name):
-        v = getattr(bbox, name)
-        return v() if callable(v) else v
     alt = {"xmin": "x_min", "ymin": "y_min", "width": "w", "height": "h"}.get(name)
-    if alt and hasattr(bbox, alt):
-        v = getattr(bbox, alt)
-        return v() if callable(v) else v
+    for attr in (name, alt):
+        if attr and hasattr(bbox, attr):
+            if callable(getattr(bbox, attr)):
+                return operator.methodcaller(attr)
+            return operator.attrgetter(attr)
     return None
 
 
+# One camera's bin; %CAM_NAME% / %IDX% are filled in per camera by CamRunner.build.
+# The cropper takes the camera's NV12 as-is; only the (network-sized) inference crop is converted to RGB
+PIPE_TEMPLATE = f"""
+        libcamerasrc camera-name="%CAM_NAME%" name=source_%IDX% !
+        video/x-raw,format=NV12,width={PREVIEW_W},height={PREVIEW_H},framerate={PREVIEW_FPS}/1,pixel-aspect-ratio=1/1 !
+        queue name=inference_wrapper_input_q_%IDX% leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
+        hailocropper name=inference_wrapper_crop_%IDX%
+            so-path="{CROP_SO}" function-name=create_crops
+            use-letterbox=true resize-method=inter-area internal-offset=true
+        hailoaggregator name=inference_wrapper_agg_%IDX%
+
+        inference_wrapper_crop_%IDX%. !
+            queue name=inference_wrapper_bypass_q_%IDX% leaky=no max-size-buffers=20 max-size-bytes=0 max-size-time=0 !
+            inference_wrapper_agg_%IDX%.sink_0
+
+        inference_wrapper_crop_%IDX%. !
+            queue name=inference_scale_q_%IDX% leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
+            videoscale n-threads=0 qos=false !
+            queue name=inference_convert_q_%IDX% leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
+            videoconvert n-threads=0 qos=false !
+            queue name=inference_hailonet_q_%IDX% leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
+            hailonet name=inference_hailonet_%IDX%
+                hef-path="{HEF_PATH}"
+                batch-size={HAILONET_BATCH}
+                vdevice-group-id=1
+                scheduling-algorithm=1
+                output-format-type=HAILO_FORMAT_TYPE_FLOAT32
+                force-writable=true !
+            queue name=inference_hailofilter_q_%IDX% leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
+            hailofilter name=inference_hailofilter_%IDX%
+                so-path="{POSTPROCESS_SO}"
+                function-name={POSTPROCESS_FN}
+                qos=false !
+            queue name=inference_output_q_%IDX% leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
+            inference_wrapper_agg_%IDX%.sink_1
+
+        inference_wrapper_agg_%IDX%. !
+            queue name=postagg_q_%IDX% leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
+            identity name=identity_callback_%IDX% !
+            tee name=tee_%IDX%
+
+        tee_%IDX%. !
+            queue name=preview_q_%IDX% leaky=downstream max-size-buffers=1 max-size-bytes=0 max-size-time=0 !
+            videoconvert n-threads=0 qos=false !
+            gtksink name=gtksink_%IDX% sync=true
+    """
+
+
 class CamRunner:
     """
-    One camera pipeline:
-      libcamerasrc -> hailo pipeline -> identity(probe reads detections) -> videoconvert -> BGRA -> cairooverlay(draw boxes) -> tee
-         tee -> gtksink (preview)
-         tee -> record bin (mkv)
+    One camera bin (both share the App's pipeline):
+      libcamerasrc -> hailo pipeline -> identity(probe reads detections, stamps boxes into the NV12 frame) -> tee
+         tee -> videoconvert -> gtksink (preview)
+         tee -> record bin (fragmented mp4)
     """
     def __init__(self, cam_name: str, idx: int):
         self.cam_name = cam_name
         self.idx = idx
 
-        self.pipeline = None
+        self.bin = None
         self.gtksink = None
         self.identity = None
-        self.cairooverlay = None
         self._tee = None
 
         self._tee_pad = None
         self._rec_bin = None
         self._recording = False
-        self._last_mkv = None
+        self._last_mp4 = None
 
         self._frame_count = 0
-
-        # store latest boxes in pixel coords: [(x0,y0,x1,y1), ...]
-        self._boxes = []
-        self._lock = threading.Lock()
-
-    def build(self):
-        pipe = f"""
-            libcamerasrc camera-name="{self.cam_name}" name=source_{self.idx} !
-            video/x-raw,format=NV12,width={PREVIEW_W},height={PREVIEW_H},framerate={PREVIEW_FPS}/1 !
-            queue name=source_q_{self.idx} leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
-            videoconvert n-threads=2 qos=false !
-            video/x-raw, pixel-aspect-ratio=1/1, format=RGB, width={PREVIEW_W}, height={PREVIEW_H} !
-            queue name=inference_wrapper_input_q_{self.idx} leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
-            hailocropper name=inference_wrapper_crop_{self.idx}
-                so-path="{CROP_SO}" function-name=create_crops
-                use-letterbox=true resize-method=inter-area internal-offset=true
-            hailoaggregator name=inference_wrapper_agg_{self.idx}
-
-            inference_wrapper_crop_{self.idx}. !
-                queue name=inference_wrapper_bypass_q_{self.idx} leaky=no max-size-buffers=20 max-size-bytes=0 max-size-time=0 !
-                inference_wrapper_agg_{self.idx}.sink_0
-
-            inference_wrapper_crop_{self.idx}. !
-                queue name=inference_scale_q_{self.idx} leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
-                videoscale n-threads=2 qos=false !
-                queue name=inference_convert_q_{self.idx} leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
-                videoconvert n-threads=2 qos=false !
-                queue name=inference_hailonet_q_{self.idx} leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
-                hailonet name=inference_hailonet_{self.idx}
-                    hef-path="{HEF_PATH}"
-                    batch-size=2
-                    vdevice-group-id=1
-                    output-format-type=HAILO_FORMAT_TYPE_FLOAT32
-                    force-writable=true !
-                queue name=inference_hailofilter_q_{self.idx} leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
-                hailofilter name=inference_hailofilter_{self.idx}
-                    so-path="{POSTPROCESS_SO}"
-                    function-name={POSTPROCESS_FN}
-                    qos=false !
-                queue name=inference_output_q_{self.idx} leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
-                inference_wrapper_agg_{self.idx}.sink_1
-
-            inference_wrapper_agg_{self.idx}. !
-                queue name=postagg_q_{self.idx} leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
-                identity name=identity_callback_{self.idx} !
-                videoconvert n-threads=2 qos=false !
-                video/x-raw,format=BGRA !
-                cairooverlay name=cairo_{self.idx} !
-                tee name=tee_{self.idx}
-
-            tee_{self.idx}. !
-                queue name=preview_q_{self.idx} leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
-                gtksink name=gtksink_{self.idx} sync=true
-        """
-
-        self.pipeline = Gst.parse_launch(pipe)
-        self.gtksink = self.pipeline.get_by_name(f"gtksink_{self.idx}")
-        self.identity = self.pipeline.get_by_name(f"identity_callback_{self.idx}")
-        self.cairooverlay = self.pipeline.get_by_name(f"cairo_{self.idx}")
-        self._tee = self.pipeline.get_by_name(f"tee_{self.idx}")
-
-        if not self.gtksink or not self.identity or not self.cairooverlay or not self._tee:
-            raise RuntimeError("Failed to build pipeline elements (gtksink/identity/cairooverlay/tee missing).")
-
-        # Probe reads detections (no writing)
+        # hailo module lookups bound once for the per-buffer probe
+        self._get_roi = hailo.get_roi_from_buffer
+        self._det_type = hailo.HAILO_DETECTION
+
+        # boxes in pixel coords (x0,y0,x1,y1), filled and drawn by the probe on the streaming thread
+        self._boxes = np.zeros((MAX_DETS, 4), np.int32)
+        self._vinfo = None  # NV12 layout of the probed pad, read once from its caps
+        self._draw_failed = False
+        self._scratch = np.empty((MAX_DETS, 4), np.float32)  # normalized xywh from the probe
+        self._bbox_accessors = None  # (xmin, ymin, width, height) getters, resolved on the first bbox
+
+    def build(self, pipeline: Gst.Pipeline):
+        desc = PIPE_TEMPLATE.replace("%CAM_NAME%", self.cam_name).replace("%IDX%", str(self.idx))
+        self.bin = Gst.parse_bin_from_description(desc, False)
+        self.bin.set_name(f"cam_bin_{self.idx}")
+        pipeline.add(self.bin)
+        self.gtksink = self.bin.get_by_name(f"gtksink_{self.idx}")
+        self.identity = self.bin.get_by_name(f"identity_callback_{self.idx}")
+        self._tee = self.bin.get_by_name(f"tee_{self.idx}")
+
+        if not self.gtksink or not self.identity or not self._tee:
+            raise RuntimeError("Failed to build pipeline elements (gtksink/identity/tee missing).")
+
+        # Probe reads detections and draws the boxes (no text) into the frame before the tee
         srcpad = self.identity.get_static_pad("src")
         srcpad.add_probe(Gst.PadProbeType.BUFFER, self._on_buffer_read_dets)
 
-        # Cairo overlay draws boxes (no text)
-        self.cairooverlay.connect("draw", self._on_cairo_draw)
-
     def widget(self) -> Gtk.Widget:
         return self.gtksink.get_property("widget")
 
-    def start(self):
-        self.pipeline.set_state(Gst.State.PLAYING)
-
-    def stop(self):
-        self.pipeline.set_state(Gst.State.NULL)
-
     def _on_buffer_read_dets(self, pad, info):
         buf = info.get_buffer()
         if buf is None:
@@ -219,120 +333,119 @@ class CamRunner:
 
         self._frame_count += 1
 
-        roi = hailo.get_roi_from_buffer(buf)
-        detections = roi.get_objects_typed(hailo.HAILO_DETECTION)
+        roi = self._get_roi(buf)
+        detections = roi.get_objects_typed(self._det_type)
 
-        boxes = []
+        raw = self._scratch
+        n = 0
         for det in detections:
+            if n == MAX_DETS:
+                break
             bbox = det.get_bbox()
-            xmin = _bbox_get(bbox, "xmin")
-            ymin = _bbox_get(bbox, "ymin")
-            bw = _bbox_get(bbox, "width")
-            bh = _bbox_get(bbox, "height")
-            if xmin is None or ymin is None or bw is None or bh is None:
+            if self._bbox_accessors is None:
+                self._bbox_accessors = tuple(_bbox_accessor(bbox, a) for a in ("xmin", "ymin", "width", "height"))
+                if None in self._bbox_accessors:
+                    print(f"[CAM{self.idx}] unsupported bbox API: {type(bbox).__name__}; boxes will not be drawn")
+            gx, gy, gw, gh = self._bbox_accessors
+            if gh is None or gw is None or gy is None or gx is None:
                 continue
 
-            x0 = int(max(0, min(PREVIEW_W - 1, xmin * PREVIEW_W)))
-            y0 = int(max(0, min(PREVIEW_H - 1, ymin * PREVIEW_H)))
-            x1 = int(max(0, min(PREVIEW_W - 1, (xmin + bw) * PREVIEW_W)))
-            y1 = int(max(0, min(PREVIEW_H - 1, (ymin + bh) * PREVIEW_H)))
-            boxes.append((x0, y0, x1, y1))
+            raw[n] = (gx(bbox), gy(bbox), gw(bbox), gh(bbox))
+            n += 1
 
-        with self._lock:
-            self._boxes = boxes
+        # Scale + clamp all boxes in a few numpy passes instead of per-coordinate Python math
+        xyxy = raw[:n]
+        xyxy[:, 2:] += xyxy[:, :2]
+        np.multiply(xyxy, _BOX_SCALE, out=xyxy)
+        np.clip(xyxy, 0, _BOX_MAX, out=xyxy)
+        boxes = self._boxes[:n]
+        boxes[:] = xyxy  # truncates to int32 like int()
+        boxes &= ~1  # even coords: NV12 chroma is subsampled 2x2
 
         # Optional small debug
         if self._frame_count % 30 == 0:
-            print(f"[CAM{self.idx}] frame={self._frame_count} dets={len(boxes)}")
+            print(f"[CAM{self.idx}] frame={self._frame_count} dets={n}")
 
-        return Gst.PadProbeReturn.OK
-
-    def _on_cairo_draw(self, overlay, context: cairo.Context, timestamp, duration):
-        # Draw most recent boxes
-        with self._lock:
-            boxes = list(self._boxes)
-
-        # Green boxes, no text
-        context.set_source_rgba(0.0, 1.0, 0.0, 1.0)
-        context.set_line_width(2.0)
+        if n and not self._draw_failed:
+            if self._vinfo is None:
+                self._vinfo = GstVideo.VideoInfo.new_from_caps(pad.get_current_caps())
+            if not draw_boxes_nv12(buf, self._vinfo, boxes):
+                self._draw_failed = True
+                print(f"[CAM{self.idx}] frame memory not writable; boxes will not be drawn")
 
-        for (x0, y0, x1, y1) in boxes:
-            w = max(1, x1 - x0)
-            h = max(1, y1 - y0)
-            context.rectangle(x0, y0, w, h)
-
-        context.stroke()
+        return Gst.PadProbeReturn.OK
 
     def start_recording(self):
         if self._recording:
             return
 
-        mkv_path = OUT_DIR / f"cam{self.idx}_{ts()}.mkv"
-        self._last_mkv = str(mkv_path)
+        OUT_DIR.mkdir(parents=True, exist_ok=True)
+        mp4_path = OUT_DIR / f"cam{self.idx}_{ts()}.mp4"
+        self._last_mp4 = str(mp4_path)
 
         rec_bin = Gst.Bin.new(f"record_bin_{self.idx}")
 
         q = make("queue")
         conv = make("videoconvert")
+        conv.set_property("n-threads", 0)
+        conv.set_property("qos", False)
 
-        caps = make("capsfilter")
-        caps.set_property("caps", Gst.Caps.from_string("video/x-raw,format=I420"))
-
-        # Software encoder only (avoid /dev/video9)
-        enc = Gst.ElementFactory.make("x264enc", None)
-        enc_name = None
-        if enc is not None:
-            enc_name = "x264enc"
-            enc.set_property("tune", "zerolatency")
-            enc.set_property("speed-preset", "veryfast")
-            enc.set_property("bitrate", 8000)  # kbps
-            enc.set_property("key-int-max", 30)
-        else:
-            enc = Gst.ElementFactory.make("avenc_h264", None)
-            if enc is not None:
-                enc_name = "avenc_h264"
-
+        enc_name, enc, raw_caps, enc_caps = make_h264_encoder()
         if enc is None:
             raise RuntimeError(
-                "No software H.264 encoder found (x264enc/avenc_h264).\n"
+                "No H.264 encoder found (v4l2h264enc/omxh264enc/x264enc/avenc_h264).\n"
                 "Install:\n"
                 "  sudo apt install -y gstreamer1.0-plugins-ugly gstreamer1.0-libav"
             )
 
+        caps = make("capsfilter")
+        caps.set_property("caps", Gst.Caps.from_string(raw_caps))
+        chain = [q, conv, caps, enc]
+        if enc_caps:
+            enc_filter = make("capsfilter")
+            enc_filter.set_property("caps", Gst.Caps.from_string(enc_caps))
+            chain.append(enc_filter)
+
         parse = make("h264parse")
         parse.set_property("config-interval", 1)
 
-        mux = make("matroskamux")
+        # Fragmented MP4 straight from the recorder: playable as written, no MKV -> MP4 remux on Stop
+        mux = make("qtmux")
+        mux.set_property("fragment-duration", 1000)  # ms
+        mux.set_property("streamable", True)
         sink = make("filesink")
-        sink.set_property("location", self._last_mkv)
+        sink.set_property("location", self._last_mp4)
+        Gst.util_set_object_arg(sink, "buffer-mode", "full")
+        sink.set_property("buffer-size", REC_WRITE_BUFFER)
         sink.set_property("sync", False)
 
-        for e in (q, conv, caps, enc, parse, mux, sink):
+        chain += [parse, mux, sink]
+        for e in chain:
             rec_bin.add(e)
 
-        link_chain(q, conv, caps, enc, parse, mux, sink)
+        link_chain(*chain)
 
         ghost = Gst.GhostPad.new("sink", q.get_static_pad("sink"))
         rec_bin.add_pad(ghost)
 
-        self.pipeline.add(rec_bin)
+        self.bin.add(rec_bin)
         rec_bin.sync_state_with_parent()
 
         tee_pad = self._tee.get_request_pad("src_%u")
         if tee_pad is None:
-            self.pipeline.remove(rec_bin)
+            self.bin.remove(rec_bin)
             raise RuntimeError("Failed to request tee src pad for recording.")
 
         if tee_pad.link(rec_bin.get_static_pad("sink")) != Gst.PadLinkReturn.OK:
             self._tee.release_request_pad(tee_pad)
-            self.pipeline.remove(rec_bin)
+            self.bin.remove(rec_bin)
             raise RuntimeError("Failed to link tee to record bin.")
 
         self._tee_pad = tee_pad
         self._rec_bin = rec_bin
         self._recording = True
 
-        print(f"[CAM{self.idx}] recording -> {self._last_mkv} (encoder={enc_name})")
+        print(f"[CAM{self.idx}] recording -> {self._last_mp4} (encoder={enc_name})")
 
     def stop_recording(self):
         if not self._recording:
@@ -350,37 +463,18 @@ class CamRunner:
 
         self._rec_bin.set_state(Gst.State.NULL)
         try:
-            self.pipeline.remove(self._rec_bin)
+            self.bin.remove(self._rec_bin)
         except Exception:
             pass
 
-        mkv = self._last_mkv
+        mp4 = self._last_mp4
         self._tee_pad = None
         self._rec_bin = None
         self._recording = False
-        self._last_mkv = None
+        self._last_mp4 = None
 
-        print(f"[CAM{self.idx}] stopped (mkv) -> {mkv}")
-        return mkv
-
-
-def remux_to_mp4_async(mkv_paths):
-    def worker():
-        for mkv in mkv_paths:
-            if mkv is None:
-                continue
-            mp4 = str(Path(mkv).with_suffix(".mp4"))
-            cmd = ["ffmpeg", "-y", "-i", mkv, "-c", "copy", "-movflags", "+faststart", mp4]
-            p = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
-            if p.returncode != 0:
-                print(f"[REMUX ERROR] ffmpeg failed for {mkv}:\n{p.stderr}")
-                continue
-            try:
-                os.remove(mkv)
-            except OSError:
-                pass
-            print(f"[REMUX] {mp4}")
-    threading.Thread(target=worker, daemon=True).start()
+        print(f"[CAM{self.idx}] stopped (mp4) -> {mp4}")
+        return mp4
 
 
 class App(Gtk.Window):
@@ -393,8 +487,10 @@ class App(Gtk.Window):
         self.cam0 = CamRunner(CAM0_NAME, 0)
         self.cam1 = CamRunner(CAM1_NAME, 1)
 
-        self.cam0.build()
-        self.cam1.build()
+        # Both camera bins live in one pipeline (one clock, one state change)
+        self.pipeline = Gst.Pipeline.new("dual_cam")
+        self.cam0.build(self.pipeline)
+        self.cam1.build(self.pipeline)
 
         root = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=8)
         root.set_border_width(8)
@@ -423,8 +519,7 @@ class App(Gtk.Window):
         self.status = Gtk.Label(label=f"HEF: {Path(HEF_PATH).name}")
         btn_row.pack_start(self.status, True, True, 0)
 
-        self.cam0.start()
-        self.cam1.start()
+        self.pipeline.set_state(Gst.State.PLAYING)
 
     def on_record(self, _btn):
         self.record_btn.set_sensitive(False)
@@ -437,11 +532,10 @@ class App(Gtk.Window):
     def on_stop(self, _btn):
         self.stop_btn.set_sensitive(False)
         self.record_btn.set_sensitive(True)
-        self.status.set_text("Stopping... (remuxing to mp4)")
+        self.status.set_text("Stopping...")
 
-        mkv0 = self.cam0.stop_recording()
-        mkv1 = self.cam1.stop_recording()
-        remux_to_mp4_async([mkv0, mkv1])
+        self.cam0.stop_recording()
+        self.cam1.stop_recording()
 
         self.status.set_text("Preview running. Videos saved in ~/Videos (mp4).")
 
@@ -1,8 +1,10 @@
 #!/usr/bin/env python3
 import os
+import sys
 import time
-import threading
-import subprocess
+import string
+import collections
+import concurrent.futures
 from pathlib import Path
 
 import gi
@@ -12,8 +14,6 @@ from gi.repository import Gtk, Gst, GLib
 
 import hailo
 
-Gst.init(None)
-
 # -----------------------
 # USER SETTINGS
 # -----------------------
@@ -23,21 +23,70 @@ CAM1_NAME = "/base/axi/pcie@1000120000/rp1/i2c@80000/imx708@1a"
 PREVIEW_W, PREVIEW_H = 1280, 720
 PREVIEW_FPS = 10
 
+# Print detections (sampled every LOG_EVERY frames). hailooverlay already draws them in C, so with this
+# off no Python probe runs on the streaming threads at all.
+LOG_DETECTIONS = True
+LOG_EVERY = 10
+
+# Display-side queues hold at most this much video (ns); only the preview queue may drop frames,
+# everything before the tee also feeds the recorder
+DISPLAY_MAX_TIME = 100 * Gst.MSECOND
+PIPELINE_LATENCY = 100 * Gst.MSECOND
+
 OUT_DIR = Path.home() / "Videos"
+REC_BITRATE_KBPS = 8000
 OUT_DIR.mkdir(parents=True, exist_ok=True)
 
 # Cropper library used by Hailo examples
 CROP_SO = "/usr/lib/aarch64-linux-gnu/hailo/tappas/post_processes/cropping_algorithms/libwhole_buffer.so"
 
+# Resolved HEF path from the last launch (see pick_detection_hef)
+HEF_CACHE = Path.home() / ".cache" / "yolo_w" / "hef_path"
+
 # Postprocess library (YOLO)
 POSTPROCESS_SO = "/usr/local/hailo/resources/so/libyolo_hailortpp_postprocess.so"
 POSTPROCESS_FN = "filter_letterbox"
 
+CONVERT_THREADS = 4  # Pi 5 cores
+
+# Filled in by init_backend() once the window is up
+HEF_PATH = None
+INFER_CONVERT = None
+
 
 def ts():
     return time.strftime("%Y%m%d_%H%M%S")
 
 
+def make_h264_encoder():
+    """
+    Best available H.264 encoder, hardware first.
+    Returns (name, encoder, raw caps it wants); name is None if none found.
+    """
+    enc = Gst.ElementFactory.make("v4l2h264enc", None)
+    # The plugin is installed on boards without the M2M block (Pi 5): only use it if its device exists
+    if enc is not None and os.path.exists(enc.get_property("device")):
+        enc.set_property("extra-controls", Gst.Structure.new_from_string(
+            f"controls,video_bitrate={REC_BITRATE_KBPS * 1000},repeat_sequence_header=1"))
+        return "v4l2h264enc", enc, "video/x-raw,format=NV12"
+    enc = Gst.ElementFactory.make("vah264enc", None)
+    if enc is not None:
+        enc.set_property("bitrate", REC_BITRATE_KBPS)
+        return "vah264enc", enc, "video/x-raw,format=NV12"
+    enc = Gst.ElementFactory.make("x264enc", None)
+    if enc is not None:
+        enc.set_property("tune", "zerolatency")
+        enc.set_property("speed-preset", "veryfast")
+        enc.set_property("bitrate", REC_BITRATE_KBPS)
+        enc.set_property("key-int-max", PREVIEW_FPS)  # the camera runs at PREVIEW_FPS: one keyframe per 1 s fragment
+        enc.set_property("threads", 2)  # leave cores for inference + preview
+        return "x264enc", enc, "video/x-raw,format=I420"
+    enc = Gst.ElementFactory.make("avenc_h264", None)
+    if enc is not None:
+        return "avenc_h264", enc, "video/x-raw,format=I420"
+    return None, None, None
+
+
 def make(name: str) -> Gst.Element:
     e = Gst.ElementFactory.make(name, None)
     if e is None:
@@ -60,11 +109,30 @@ def pick_detection_hef() -> str:
     Your code was using a POSE HEF (yolov8s_pose.hef) with detection postprocess.
     That can yield black output / negotiation problems.
     This picks a YOLO *detection* HEF from the standard directory.
+    The answer is cached (keyed on the directory's mtime) so later launches skip the scan.
     """
     base = Path("/usr/local/hailo/resources/models/hailo8l")
     if not base.exists():
         raise RuntimeError(f"HEF directory not found: {base}")
 
+    stamp = str(base.stat().st_mtime_ns)
+    try:
+        cached_stamp, cached = HEF_CACHE.read_text().splitlines()
+        if cached_stamp == stamp and os.access(cached, os.R_OK):
+            return cached
+    except (OSError, ValueError):
+        pass
+
+    hef = _scan_detection_hef(base)
+    try:
+        HEF_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        HEF_CACHE.write_text(f"{stamp}\n{hef}\n")
+    except OSError:
+        pass
+    return hef
+
+
+def _scan_detection_hef(base: Path) -> str:
     hefs = sorted(base.glob("*.hef"))
     if not hefs:
         raise RuntimeError(f"No .hef files found in: {base}")
@@ -94,10 +162,79 @@ def pick_detection_hef() -> str:
     return str(hefs[0])
 
 
-HEF_PATH = pick_detection_hef()
+def init_backend():
+    """Gst.init + HEF lookup, deferred from import so the window can paint first."""
+    global HEF_PATH, INFER_CONVERT
+    if HEF_PATH is not None:
+        return
+    Gst.init(None)
+    HEF_PATH = pick_detection_hef()
+
+    # Scale + colour-convert the inference crop in one pass (videoconvertscale, GStreamer >= 1.22).
+    # The network doesn't need dithering or chroma resampling filters: nearest chroma, no dither.
+    if Gst.ElementFactory.find("videoconvertscale") is not None:
+        INFER_CONVERT = (f"videoconvertscale n-threads={CONVERT_THREADS} method=nearest-neighbour "
+                         f"dither=none chroma-mode=none qos=false")
+    else:
+        INFER_CONVERT = (f"videoscale n-threads={CONVERT_THREADS} method=nearest-neighbour qos=false ! "
+                         f"videoconvert n-threads={CONVERT_THREADS} dither=none chroma-mode=none qos=false")
+
+    print("Using:")
+    print("  HEF:", HEF_PATH)
+    print("  Postprocess SO:", POSTPROCESS_SO)
+    print("  Postprocess FN:", POSTPROCESS_FN)
+
+# Both cameras feed the one hailonet (see CamRunner.build_all), so a batch fills from either stream.
+# The scheduler runs the network once SCHEDULER_THRESHOLD frames wait (or after the timeout).
+HAILONET_BATCH = 8
+SCHEDULER_THRESHOLD = 4
+SCHEDULER_TIMEOUT_MS = 50
 
 
 class CamRunner:
+    # One camera's branch; the f-string fills the module settings once, substitute() fills $cam_name/$idx
+    # (and $infer_convert, only known after init_backend).
+    # Key fixes:
+    #  - Removed nms-score-threshold / nms-iou-threshold (you got status=6)
+    #  - Force preview colors: video/x-raw,format=BGRx before gtksink
+    #  - The cropper takes the camera's NV12 as-is; only the (network-sized) inference crop is converted to RGB
+    PIPE_TEMPLATE = string.Template(f"""
+            libcamerasrc camera-name="$cam_name" name=source_$idx !
+            video/x-raw,format=NV12,width={PREVIEW_W},height={PREVIEW_H},framerate={PREVIEW_FPS}/1,pixel-aspect-ratio=1/1 !
+            queue name=inference_wrapper_input_q_$idx leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
+            hailocropper name=inference_wrapper_crop_$idx
+                so-path="{CROP_SO}" function-name=create_crops
+                use-letterbox=true resize-method=bilinear internal-offset=true
+            hailoaggregator name=inference_wrapper_agg_$idx
+
+            inference_wrapper_crop_$idx. !
+                queue name=inference_wrapper_bypass_q_$idx leaky=no max-size-buffers=6 max-size-bytes=0 max-size-time=0 !
+                inference_wrapper_agg_$idx.sink_0
+
+            inference_wrapper_crop_$idx. !
+                queue name=inference_convert_q_$idx leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
+                $infer_convert !
+                inference_rr.sink_$idx
+
+            inference_router.src_$idx !
+                queue name=inference_output_q_$idx leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
+                inference_wrapper_agg_$idx.sink_1
+
+            inference_wrapper_agg_$idx. !
+                queue name=postagg_q_$idx leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
+                identity name=identity_callback_$idx !
+                queue name=overlay_q_$idx leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time={DISPLAY_MAX_TIME} !
+                hailooverlay name=hailo_overlay_$idx qos=false !
+                queue name=display_convert_q_$idx leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time={DISPLAY_MAX_TIME} !
+                videoconvert n-threads={CONVERT_THREADS} qos=false !
+                video/x-raw,format=BGRx !
+                tee name=tee_$idx
+
+            tee_$idx. !
+                queue name=preview_q_$idx leaky=downstream max-size-buffers=3 max-size-bytes=0 max-size-time={DISPLAY_MAX_TIME} !
+                gtksink name=gtksink_$idx sync=false qos=false
+        """)
+
     def __init__(self, cam_name: str, idx: int):
         self.cam_name = cam_name
         self.idx = idx
@@ -110,66 +247,53 @@ class CamRunner:
         self._tee_pad = None
         self._rec_bin = None
         self._recording = False
-        self._last_mkv = None
+        self._last_mp4 = None
 
         self._frame_count = 0
-
-    def build(self):
-        # Key fixes:
-        #  - Removed nms-score-threshold / nms-iou-threshold (you got status=6)
-        #  - Force preview colors: video/x-raw,format=BGRx before gtksink
-        pipe = f"""
-            libcamerasrc camera-name="{self.cam_name}" name=source_{self.idx} !
-            video/x-raw,format=NV12,width={PREVIEW_W},height={PREVIEW_H},framerate={PREVIEW_FPS}/1 !
-            queue name=source_q_{self.idx} leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
-            videoconvert n-threads=2 qos=false !
-            video/x-raw, pixel-aspect-ratio=1/1, format=RGB, width={PREVIEW_W}, height={PREVIEW_H} !
-            queue name=inference_wrapper_input_q_{self.idx} leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
-            hailocropper name=inference_wrapper_crop_{self.idx}
-                so-path="{CROP_SO}" function-name=create_crops
-                use-letterbox=true resize-method=inter-area internal-offset=true
-            hailoaggregator name=inference_wrapper_agg_{self.idx}
-
-            inference_wrapper_crop_{self.idx}. !
-                queue name=inference_wrapper_bypass_q_{self.idx} leaky=no max-size-buffers=20 max-size-bytes=0 max-size-time=0 !
-                inference_wrapper_agg_{self.idx}.sink_0
-
-            inference_wrapper_crop_{self.idx}. !
-                queue name=inference_scale_q_{self.idx} leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
-                videoscale n-threads=2 qos=false !
-                queue name=inference_convert_q_{self.idx} leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
-                videoconvert n-threads=2 qos=false !
-                queue name=inference_hailonet_q_{self.idx} leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
-                hailonet name=inference_hailonet_{self.idx}
+        self._log_every = LOG_EVERY
+        # hailo module lookups bound once for the per-buffer probe
+        self._get_roi = hailo.get_roi_from_buffer
+        self._det_type = hailo.HAILO_DETECTION
+        # (frame, detections) handed from the probe to the UI-thread logger; stale entries just fall off
+        self._dets_q = collections.deque(maxlen=4)
+
+    @classmethod
+    def build_all(cls, runners) -> Gst.Pipeline:
+        """
+        One pipeline for every camera, sharing one hailonet (one HEF load, one network group):
+          each cam's crop -> hailoroundrobin -> hailonet -> hailofilter -> hailostreamrouter -> that cam's aggregator
+        The router sends each result to the camera whose roundrobin sink pad it came in on.
+        """
+        routes = " ".join(f'src_{r.idx}::input-streams="<sink_{r.idx}>"' for r in runners)
+        shared = f"""
+            hailoroundrobin name=inference_rr mode=0 !
+                queue name=inference_hailonet_q leaky=no max-size-buffers=16 max-size-bytes=0 max-size-time=0 !
+                hailonet name=inference_hailonet
                     hef-path="{HEF_PATH}"
-                    batch-size=2
+                    batch-size={HAILONET_BATCH}
                     vdevice-group-id=1
-                    output-format-type=HAILO_FORMAT_TYPE_FLOAT32
+                    scheduling-algorithm=1
+                    scheduler-threshold={SCHEDULER_THRESHOLD}
+                    scheduler-timeout-ms={SCHEDULER_TIMEOUT_MS}
+                    output-format-type=HAILO_FORMAT_TYPE_AUTO
                     force-writable=true !
-                queue name=inference_hailofilter_q_{self.idx} leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
-                hailofilter name=inference_hailofilter_{self.idx}
+                queue name=inference_hailofilter_q leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
+                hailofilter name=inference_hailofilter
                     so-path="{POSTPROCESS_SO}"
                     function-name={POSTPROCESS_FN}
                     qos=false !
-                queue name=inference_output_q_{self.idx} leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
-                inference_wrapper_agg_{self.idx}.sink_1
-
-            inference_wrapper_agg_{self.idx}. !
-                queue name=postagg_q_{self.idx} leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
-                identity name=identity_callback_{self.idx} !
-                queue name=overlay_q_{self.idx} leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
-                hailooverlay name=hailo_overlay_{self.idx} !
-                queue name=display_convert_q_{self.idx} leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
-                videoconvert n-threads=2 qos=false !
-                video/x-raw,format=BGRx !
-                tee name=tee_{self.idx}
-
-            tee_{self.idx}. !
-                queue name=preview_q_{self.idx} leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0 !
-                gtksink name=gtksink_{self.idx} sync=true
+                hailostreamrouter name=inference_router {routes}
         """
+        pipeline = Gst.parse_launch("".join(r.fragment() for r in runners) + shared)
+        for r in runners:
+            r.attach(pipeline)
+        return pipeline
 
-        self.pipeline = Gst.parse_launch(pipe)
+    def fragment(self) -> str:
+        return self.PIPE_TEMPLATE.substitute(cam_name=self.cam_name, idx=self.idx, infer_convert=INFER_CONVERT)
+
+    def attach(self, pipeline: Gst.Pipeline):
+        self.pipeline = pipeline
         self.gtksink = self.pipeline.get_by_name(f"gtksink_{self.idx}")
         self.identity = self.pipeline.get_by_name(f"identity_callback_{self.idx}")
         self._tee = self.pipeline.get_by_name(f"tee_{self.idx}")
@@ -177,77 +301,80 @@ class CamRunner:
         if not self.gtksink or not self.identity or not self._tee:
             raise RuntimeError("Failed to build pipeline elements (gtksink/identity/tee missing).")
 
-        srcpad = self.identity.get_static_pad("src")
-        srcpad.add_probe(Gst.PadProbeType.BUFFER, self._on_buffer)
+        if LOG_DETECTIONS:
+            srcpad = self.identity.get_static_pad("src")
+            srcpad.add_probe(Gst.PadProbeType.BUFFER, self._on_buffer)
+            # Formatting/printing happens here at 10 Hz, off the streaming thread
+            GLib.timeout_add(100, self._log_detections)
 
     def widget(self) -> Gtk.Widget:
         return self.gtksink.get_property("widget")
 
-    def start(self):
-        self.pipeline.set_state(Gst.State.PLAYING)
-
-    def stop(self):
-        self.pipeline.set_state(Gst.State.NULL)
-
     def _on_buffer(self, pad, info):
         buf = info.get_buffer()
         if buf is None:
             return Gst.PadProbeReturn.OK
 
         self._frame_count += 1
-        roi = hailo.get_roi_from_buffer(buf)
-        detections = roi.get_objects_typed(hailo.HAILO_DETECTION)
+        # Sampled: the other frames skip the ROI lookup entirely
+        if self._frame_count % self._log_every:
+            return Gst.PadProbeReturn.OK
 
-        lines = []
-        for det in detections:
-            lines.append(f"{det.get_label()} {det.get_confidence():.2f}")
-        if lines:
-            print(f"[CAM{self.idx}] frame={self._frame_count} :: " + ", ".join(lines[:8]))
+        roi = self._get_roi(buf)
+        detections = roi.get_objects_typed(self._det_type)
+
+        # Detections are shared_ptrs, so they stay valid after the buffer moves on
+        if detections:
+            self._dets_q.append((self._frame_count, detections))
 
         return Gst.PadProbeReturn.OK
 
+    def _log_detections(self):
+        # One write + flush per tick for everything queued since the last one
+        out = []
+        while self._dets_q:
+            frame, detections = self._dets_q.popleft()
+            lines = [f"{det.get_label()} {det.get_confidence():.2f}" for det in detections[:8]]
+            out.append(f"[CAM{self.idx}] frame={frame} :: " + ", ".join(lines) + "\n")
+        if out:
+            sys.stdout.write("".join(out))
+            sys.stdout.flush()
+        return True
+
     def start_recording(self):
         if self._recording:
             return
 
-        mkv_path = OUT_DIR / f"cam{self.idx}_{ts()}.mkv"
-        self._last_mkv = str(mkv_path)
+        mp4_path = OUT_DIR / f"cam{self.idx}_{ts()}.mp4"
+        self._last_mp4 = str(mp4_path)
 
         rec_bin = Gst.Bin.new(f"record_bin_{self.idx}")
 
         q = make("queue")
         conv = make("videoconvert")
+        conv.set_property("n-threads", CONVERT_THREADS)
 
-        caps = make("capsfilter")
-        caps.set_property("caps", Gst.Caps.from_string("video/x-raw,format=I420"))
-
-        # IMPORTANT: NO v4l2h264enc (that is what triggers /dev/video9 errors)
-        enc = Gst.ElementFactory.make("x264enc", None)
-        enc_name = None
-        if enc is not None:
-            enc_name = "x264enc"
-            enc.set_property("tune", "zerolatency")
-            enc.set_property("speed-preset", "veryfast")
-            enc.set_property("bitrate", 8000)       # kbps
-            enc.set_property("key-int-max", 30)
-        else:
-            enc = Gst.ElementFactory.make("avenc_h264", None)
-            if enc is not None:
-                enc_name = "avenc_h264"
-
+        enc_name, enc, raw_caps = make_h264_encoder()
         if enc is None:
             raise RuntimeError(
-                "No software H.264 encoder found (x264enc/avenc_h264).\n"
+                "No H.264 encoder found (v4l2h264enc/vah264enc/x264enc/avenc_h264).\n"
                 "Install:\n"
                 "  sudo apt install -y gstreamer1.0-plugins-ugly gstreamer1.0-libav"
             )
 
+        caps = make("capsfilter")
+        caps.set_property("caps", Gst.Caps.from_string(raw_caps))
+
         parse = make("h264parse")
-        parse.set_property("config-interval", 1)
+        # SPS/PPS ride in the MP4 header; in-band copies only on IDR frames (keeps each fragment decodable)
+        parse.set_property("config-interval", -1)
 
-        mux = make("matroskamux")
+        # Fragmented MP4 straight from the recorder: playable as written, no MKV -> MP4 remux on Stop
+        mux = make("mp4mux")
+        mux.set_property("fragment-duration", 1000)  # ms
+        mux.set_property("streamable", True)
         sink = make("filesink")
-        sink.set_property("location", self._last_mkv)
+        sink.set_property("location", self._last_mp4)
         sink.set_property("sync", False)
 
         for e in (q, conv, caps, enc, parse, mux, sink):
@@ -276,7 +403,7 @@ class CamRunner:
         self._rec_bin = rec_bin
         self._recording = True
 
-        print(f"[CAM{self.idx}] recording -> {self._last_mkv} (encoder={enc_name})")
+        print(f"[CAM{self.idx}] recording -> {self._last_mp4} (encoder={enc_name})")
 
     def stop_recording(self):
         if not self._recording:
@@ -299,34 +426,15 @@ class CamRunner:
         except Exception:
             pass
 
-        mkv = self._last_mkv
+        mp4 = self._last_mp4
 
         self._tee_pad = None
         self._rec_bin = None
         self._recording = False
-        self._last_mkv = None
-
-        print(f"[CAM{self.idx}] stopped (mkv) -> {mkv}")
-        return mkv
-
-
-def remux_to_mp4_async(mkv_paths):
-    def worker():
-        for mkv in mkv_paths:
-            if mkv is None:
-                continue
-            mp4 = str(Path(mkv).with_suffix(".mp4"))
-            cmd = ["ffmpeg", "-y", "-i", mkv, "-c", "copy", "-movflags", "+faststart", mp4]
-            p = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
-            if p.returncode != 0:
-                print(f"[REMUX ERROR] ffmpeg failed for {mkv}:\n{p.stderr}")
-                continue
-            try:
-                os.remove(mkv)
-            except OSError:
-                pass
-            print(f"[REMUX] {mp4}")
-    threading.Thread(target=worker, daemon=True).start()
+        self._last_mp4 = None
+
+        print(f"[CAM{self.idx}] stopped (mp4) -> {mp4}")
+        return mp4
 
 
 class App(Gtk.Window):
@@ -338,26 +446,21 @@ class App(Gtk.Window):
 
         self.cam0 = CamRunner(CAM0_NAME, 0)
         self.cam1 = CamRunner(CAM1_NAME, 1)
-
-        self.cam0.build()
-        self.cam1.build()
+        self.pipeline = None
 
         root = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=8)
         root.set_border_width(8)
         self.add(root)
 
-        videos = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
-        root.pack_start(videos, True, True, 0)
-
-        videos.pack_start(self.cam0.widget(), True, True, 0)
-        videos.pack_start(Gtk.Separator(orientation=Gtk.Orientation.VERTICAL), False, False, 0)
-        videos.pack_start(self.cam1.widget(), True, True, 0)
+        self.videos = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
+        root.pack_start(self.videos, True, True, 0)
 
         btn_row = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
         root.pack_start(btn_row, False, False, 0)
 
         self.record_btn = Gtk.Button(label="Record")
         self.stop_btn = Gtk.Button(label="Stop")
+        self.record_btn.set_sensitive(False)  # until the pipeline is up
         self.stop_btn.set_sensitive(False)
 
         self.record_btn.connect("clicked", self.on_record)
@@ -366,37 +469,60 @@ class App(Gtk.Window):
         btn_row.pack_start(self.record_btn, False, False, 0)
         btn_row.pack_start(self.stop_btn, False, False, 0)
 
-        self.status = Gtk.Label(label=f"HEF: {Path(HEF_PATH).name}")
+        self.status = Gtk.Label(label="Starting cameras...")
         btn_row.pack_start(self.status, True, True, 0)
 
-        self.cam0.start()
-        self.cam1.start()
+        # Build the pipelines on the next main-loop iteration, after the window has painted
+        GLib.idle_add(self._start_backend)
+
+    def _start_backend(self):
+        init_backend()
+        self.pipeline = CamRunner.build_all([self.cam0, self.cam1])
+
+        self.videos.pack_start(self.cam0.widget(), True, True, 0)
+        self.videos.pack_start(Gtk.Separator(orientation=Gtk.Orientation.VERTICAL), False, False, 0)
+        self.videos.pack_start(self.cam1.widget(), True, True, 0)
+        self.videos.show_all()
+
+        self.status.set_text(f"HEF: {Path(HEF_PATH).name}")
+        self.record_btn.set_sensitive(True)
+        # Nothing renders against the clock (sync=false), so keep the latency budget small and fixed
+        self.pipeline.set_latency(PIPELINE_LATENCY)
+        self.pipeline.set_state(Gst.State.PLAYING)
+        return False
 
     def on_record(self, _btn):
         self.record_btn.set_sensitive(False)
         self.stop_btn.set_sensitive(True)
         self.status.set_text("Recording...")
 
-        self.cam0.start_recording()
-        self.cam1.start_recording()
+        # Both record bins build in parallel (encoder device open dominates); errors surface here
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=2) as ex:
+                futures = [ex.submit(cam.start_recording) for cam in (self.cam0, self.cam1)]
+                for f in concurrent.futures.as_completed(futures):
+                    f.result()
+        except Exception as e:
+            # Don't leave one camera recording alone: tear down whichever bin did start
+            self.cam0.stop_recording()
+            self.cam1.stop_recording()
+            self.stop_btn.set_sensitive(False)
+            self.record_btn.set_sensitive(True)
+            self.status.set_text(f"Recording failed: {e}")
+            print(f"Recording failed: {e}", file=sys.stderr)
 
     def on_stop(self, _btn):
         self.stop_btn.set_sensitive(False)
         self.record_btn.set_sensitive(True)
-        self.status.set_text("Stopping... (remuxing to mp4)")
+        self.status.set_text("Stopping...")
 
-        mkv0 = self.cam0.stop_recording()
-        mkv1 = self.cam1.stop_recording()
-        remux_to_mp4_async([mkv0, mkv1])
+        self.cam0.stop_recording()
+        self.cam1.stop_recording()
 
         self.status.set_text("Preview running. Videos saved in ~/Videos (mp4).")
 
 
 if __name__ == "__main__":
-    print("Using:")
-    print("  HEF:", HEF_PATH)
-    print("  Postprocess SO:", POSTPROCESS_SO)
-    print("  Postprocess FN:", POSTPROCESS_FN)
     win = App()
     win.show_all()
     Gtk.main()